@@ -1,416 +1,523 @@
 # Useful imports
 import os
-from pathlib import Path
-import tempfile
-import hydra
-import numpy as np
-import matplotlib.pyplot as plt 
-
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from itertools import islice
+
+import cv2
+import imageio
+from tqdm import tqdm
 
 from nuplan.common.actor_state.vehicle_parameters import get_pacifica_parameters
-from nuplan.planning.scenario_builder.nuplan_db.nuplan_scenario import NuPlanScenario, CameraChannel, LidarChannel
+from nuplan.planning.scenario_builder.nuplan_db.nuplan_scenario import NuPlanScenario, CameraChannel
 from nuplan.planning.scenario_builder.nuplan_db.nuplan_scenario_utils import ScenarioExtractionInfo
 
+from encoderSettings import encoder_settings, writer_kwargs
+from exportManifest import ExportManifest, partial_path
+from exportProfile import NULL_PROFILE, ExportProfile
+from frameArchive import ArchiveLayout, ArchiveWriter
+from frameNormalize import BufferPool, FrameNormalizer
+from frameSidecar import FrameSidecar, SidecarWriter, sidecar_path
+from jpegPassthrough import READAHEAD_ITERATIONS, JpegFiles, JpegPipeWriter, camera_image_files
+from lidarIndex import EXPORT_ITERATION_STEP, EXTRACTION_OFFSET, FIRST_EXPORT_ITERATION, SUBSAMPLE_RATIO, LidarIndex
+from viewLayout import (ARCHIVE_STREAM, MOSAIC_LAYOUT, MOSAIC_SIZE, MOSAIC_STREAM, TILE_SIZES, proxy_stream,
+                        video_filename)
+
 
 
 NUPLAN_DATA_ROOT = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset"
 NUPLAN_MAP_VERSION = "nuplan-maps-v1.0"
 NUPLAN_MAPS_ROOT = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/maps"
 NUPLAN_SENSOR_ROOT = f"{NUPLAN_DATA_ROOT}/nuplan-v1.1/sensor_blobs"
-NAME = "2021.05.12.22.00.38_veh-35_01008_01518" #change name to target file
+NUPLAN_SPLIT_ROOT = f"{NUPLAN_DATA_ROOT}/nuplan-v1.1/splits/mini"
+NAME = "2021.05.12.22.00.38_veh-35_01008_01518" #change name to target file (single-log runs)
 
 
-TEST_DB_FILE = f"{NUPLAN_DATA_ROOT}/nuplan-v1.1/splits/mini/{NAME}.db"
+TEST_DB_FILE = f"{NUPLAN_SPLIT_ROOT}/{NAME}.db"
 MAP_NAME = "us-nv-las-vegas"
-TEST_INITIAL_LIDAR_PC = "e1e4ee25d1ff58f2"
-TEST_INITIAL_TIMESTAMP = 1620857889651124
-
-import sqlite3
-
-# Path to your DB
-TEST_DB_FILE = f"{NUPLAN_DATA_ROOT}/nuplan-v1.1/splits/mini/{NAME}.db"
-
-# Automatically get the first LiDAR token and timestamp from the DB
-conn = sqlite3.connect(TEST_DB_FILE)
-cursor = conn.cursor()
-
-# Get first token
-cursor.execute("SELECT token, timestamp FROM lidar_pc ORDER BY timestamp ASC LIMIT 1")
-row = cursor.fetchone()
-if row is None:
-    raise ValueError(f"No LiDAR frames found in DB {TEST_DB_FILE}")
-
-TEST_INITIAL_LIDAR_PC = row[0].hex()  # convert from bytes to hex string
-TEST_INITIAL_TIMESTAMP = row[1]       # timestamp in microseconds
-
-print(f"Using initial token: {TEST_INITIAL_LIDAR_PC}, timestamp: {TEST_INITIAL_TIMESTAMP}")
-
-conn.close()
-
-#worth trying using a fake lidar
-scenario = NuPlanScenario(
-            data_root=f"{NUPLAN_DATA_ROOT}/nuplan-v1.1/splits/mini",
-            log_file_load_path=TEST_DB_FILE,
-            initial_lidar_token=TEST_INITIAL_LIDAR_PC,
-            initial_lidar_timestamp=TEST_INITIAL_TIMESTAMP,
-            scenario_type="scenario_type",
-            map_root=NUPLAN_MAPS_ROOT,
-            map_version=NUPLAN_MAP_VERSION,
-            map_name=MAP_NAME,
-            scenario_extraction_info=ScenarioExtractionInfo(
-                scenario_name="scenario_name", scenario_duration=509, extraction_offset=1, subsample_ratio=0.5
-            ),
-            ego_vehicle_parameters=get_pacifica_parameters(),
-            sensor_root=NUPLAN_DATA_ROOT+"/nuplan-v1.1/sensor_blobs",
-)
-
-# Total number of iterations (frames) in this scenario
-num_frames = scenario.get_number_of_iterations()
-print(f"Scenario contains {num_frames} LiDAR frames")
-
-# First and last timestamps (microseconds)
-start_ts = scenario.get_time_point(0).time_us
-end_ts   = scenario.get_time_point(num_frames - 1).time_us
-
-# Duration in seconds
-max_duration_sec = (end_ts - start_ts) * 1e-6
-print(f"Maximum legal scenario duration from initial frame: {max_duration_sec:.2f} seconds")
-TEST_INITIAL_TIMESTAMP = start_ts
-
-scenario = NuPlanScenario(
-            data_root=f"{NUPLAN_DATA_ROOT}/nuplan-v1.1/splits/mini",
-            log_file_load_path=TEST_DB_FILE,
-            initial_lidar_token=TEST_INITIAL_LIDAR_PC,
-            initial_lidar_timestamp=TEST_INITIAL_TIMESTAMP,
-            scenario_type="scenario_type",
-            map_root=NUPLAN_MAPS_ROOT,
-            map_version=NUPLAN_MAP_VERSION,
-            map_name=MAP_NAME,
-            scenario_extraction_info=ScenarioExtractionInfo(
-                scenario_name="scenario_name", scenario_duration=max_duration_sec - 1, extraction_offset=1, subsample_ratio=0.5
-            ),
-            ego_vehicle_parameters=get_pacifica_parameters(),
-            sensor_root=NUPLAN_DATA_ROOT+"/nuplan-v1.1/sensor_blobs",
-)
-
-import sqlite3
-
-# Path to your DB
-db_path = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/nuplan-v1.1/splits/mini/2021.05.12.22.00.38_veh-35_01008_01518.db"
-
-# Connect
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# Count total frames
-cursor.execute("SELECT COUNT(*) FROM lidar_pc")
-num_frames = cursor.fetchone()[0]
-print(f"Total LiDAR frames in log: {num_frames}")
-
-# Get first and last timestamps (microseconds)
-cursor.execute("SELECT timestamp FROM lidar_pc ORDER BY timestamp ASC LIMIT 1")
-start_ts = cursor.fetchone()[0]
-
-cursor.execute("SELECT timestamp FROM lidar_pc ORDER BY timestamp DESC LIMIT 1")
-end_ts = cursor.fetchone()[0]
-
-print(f"First timestamp: {start_ts}, Last timestamp: {end_ts}")
-print(f"Full log duration: {(end_ts - start_ts) * 1e-6:.2f} seconds")
-
-import sqlite3
-
-DB_PATH = f"/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/nuplan-v1.1/splits/mini/{NAME}.db"
-
-def token_to_timestamp(token: str) -> int:
-    """Convert a LiDAR token string to its timestamp (microseconds)."""
-    # Convert token string to bytes for DB comparison
-    token_bytes = bytes.fromhex(token)
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT timestamp FROM lidar_pc WHERE token=?", (token_bytes,))
-    row = cursor.fetchone()
-    conn.close()
-    if row is None:
-        raise ValueError(f"Token {token} not found in DB")
-    return row[0]
-
-def timestamp_to_token(timestamp: int) -> str:
-    """Find the LiDAR token corresponding to a timestamp.
-    Returns the first token with timestamp >= given value, as a hex string.
-    """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT token FROM lidar_pc WHERE timestamp >= ? ORDER BY timestamp ASC LIMIT 1",
-        (timestamp,)
-    )
-    row = cursor.fetchone()
-    conn.close()
-    if row is None:
-        raise ValueError(f"No token found at or after timestamp {timestamp}")
-    
-    # Convert BLOB to hex string
-    return row[0].hex()
-
-# Example usage
-TEST_TIMESTAMP = start_ts
-
-
-tk = timestamp_to_token(TEST_TIMESTAMP)
-print(f"Timestamp {TEST_TIMESTAMP} corresponds to token {tk}")
-
-import numpy as np
-import imageio
-from nuplan.planning.scenario_builder.nuplan_db.nuplan_scenario import (
-    CameraChannel, LidarChannel
-)
-from tqdm import tqdm
-
-num_frames = scenario.get_number_of_iterations()
-print(f"Number of frames in scenario: {num_frames}")
-
 
-Perspectives = {"B0", "F0", "L0", "L1", "L2", "R0", "R1", "R2"}
+# Camera suffix -> nuPlan channel, in the order the videos are written
+CAMERAS = {
+    "B0": CameraChannel.CAM_B0,
+    "F0": CameraChannel.CAM_F0,
+    "L0": CameraChannel.CAM_L0,
+    "L1": CameraChannel.CAM_L1,
+    "L2": CameraChannel.CAM_L2,
+    "R0": CameraChannel.CAM_R0,
+    "R1": CameraChannel.CAM_R1,
+    "R2": CameraChannel.CAM_R2,
+}
 
 outfolder = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/videos/"
-
-output_path = outfolder + f"{NAME}B0.mp4"
-fps = 20  # LiDAR is ~20 Hz
-
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_B0, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
-
-        img = sensors.images[CameraChannel.CAM_B0].as_numpy
-
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
-
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
-
-        writer.append_data(img)
-
-print(f"Saved video to: {output_path}")
-
-output_path = outfolder + f"{NAME}F0.mp4"
-fps = 20  # LiDAR is ~20 Hz
-
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_F0, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
-
-        img = sensors.images[CameraChannel.CAM_F0].as_numpy
-
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
-
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
-
-        writer.append_data(img)
-
-print(f"Saved video to: {output_path}")
-
-output_path = outfolder + f"{NAME}L0.mp4"
 fps = 20  # LiDAR is ~20 Hz
+LOADER_WORKERS = 4       # threads fetching/decoding sensor frames
+ENCODE_QUEUE_SIZE = 4    # frames buffered per stream before loaders block (~6 MB each at full size)
+MOSAIC_EXPORT = True     # also write <name>_mosaic.mp4 in the labeler grid layout
+PROXY_EXPORT = True      # also write <name><cam>_proxy.mp4 at labeler display size
+PROXY_GOP = 10           # keyframe interval of the proxies, for fast seeking
+ARCHIVE_EXPORT = False   # also write <name>_archive.bin, a memory-mapped archive of exact RGB tiles
+ARCHIVE_TILE_SIZES = TILE_SIZES  # (width, height) per camera stored in the archive
+ENCODER = encoder_settings()  # e.g. encoder_settings(preset="veryfast", crf=23, threads=2)
+JPEG_PASSTHROUGH = False # full-size camera videos from the sensor_blobs JPEGs via ffmpeg, no Python decode
+PROFILE_EXPORT = False   # write <name>.profile.json/.csv with per-stage timings, skipped frames and peak RSS
+PROFILE_CPROFILE = False # also dump a merged cProfile of all pipeline threads to <name>.prof
+
+
+def log_name(db_path):
+    """Log name used for the output files, e.g. 2021.05.12.22.00.38_veh-35_01008_01518."""
+    return os.path.splitext(os.path.basename(db_path))[0]
+
+
+def first_lidar_frame(db_path):
+    """Return (token hex, timestamp) of the first LiDAR frame in the log."""
+    index = LidarIndex.load(db_path)
+    if not len(index):
+        raise ValueError(f"No LiDAR frames found in DB {db_path}")
+    return index.token(0), index.first_timestamp  # timestamp in microseconds
+
+
+def build_scenario(db_path, initial_token, initial_timestamp, duration):
+    """Build a NuPlanScenario covering `duration` seconds from the given LiDAR frame."""
+    return NuPlanScenario(
+        data_root=NUPLAN_SPLIT_ROOT,
+        log_file_load_path=db_path,
+        initial_lidar_token=initial_token,
+        initial_lidar_timestamp=initial_timestamp,
+        scenario_type="scenario_type",
+        map_root=NUPLAN_MAPS_ROOT,
+        map_version=NUPLAN_MAP_VERSION,
+        map_name=MAP_NAME,
+        scenario_extraction_info=ScenarioExtractionInfo(
+            scenario_name="scenario_name", scenario_duration=duration, extraction_offset=EXTRACTION_OFFSET,
+            subsample_ratio=SUBSAMPLE_RATIO,
+        ),
+        ego_vehicle_parameters=get_pacifica_parameters(),
+        sensor_root=NUPLAN_SENSOR_ROOT,
+    )
 
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_L0, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
-
-        img = sensors.images[CameraChannel.CAM_L0].as_numpy
-
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
-
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
-
-        writer.append_data(img)
-
-print(f"Saved video to: {output_path}")
-
-output_path = outfolder + f"{NAME}L1.mp4"
-fps = 20  # LiDAR is ~20 Hz
-
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_L1, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
-
-        img = sensors.images[CameraChannel.CAM_L1].as_numpy
-
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
-
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
-
-        writer.append_data(img)
-
-print(f"Saved video to: {output_path}")
 
-output_path = outfolder + f"{NAME}L2.mp4"
-fps = 20  # LiDAR is ~20 Hz
+def build_full_log_scenario(db_path):
+    """Build a scenario spanning the whole log.
 
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_L2, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
+    The start frame and usable duration come straight from the lidar_pc
+    index, so the scenario is only constructed once.
+    """
+    index = LidarIndex.load(db_path)
+    initial_token, initial_timestamp, max_duration_sec = index.full_log_window(EXTRACTION_OFFSET, SUBSAMPLE_RATIO)
+    print(f"Using initial token: {initial_token}, timestamp: {initial_timestamp}")
+    print(f"Maximum legal scenario duration from initial frame: {max_duration_sec:.2f} seconds")
 
-        img = sensors.images[CameraChannel.CAM_L2].as_numpy
+    return build_scenario(db_path, initial_token, initial_timestamp, max_duration_sec)
 
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
 
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
+def print_log_summary(db_path):
+    """Print frame count and time span of the log's LiDAR table."""
+    index = LidarIndex.load(db_path)
+    print(f"Total LiDAR frames in log: {len(index)}")
+    print(f"First timestamp: {index.first_timestamp}, Last timestamp: {index.last_timestamp}")
+    print(f"Full log duration: {index.duration_sec:.2f} seconds")
 
-        writer.append_data(img)
 
-print(f"Saved video to: {output_path}")
+DB_PATH = TEST_DB_FILE
 
-output_path = outfolder + f"{NAME}R0.mp4"
-fps = 20  # LiDAR is ~20 Hz
+def token_to_timestamp(token: str) -> int:
+    """Convert a LiDAR token string to its timestamp (microseconds)."""
+    return LidarIndex.load(DB_PATH).token_to_timestamp(token)
 
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_R0, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
+def timestamp_to_token(timestamp: int) -> str:
+    """Find the LiDAR token corresponding to a timestamp.
+    Returns the first token with timestamp >= given value, as a hex string.
+    """
+    return LidarIndex.load(DB_PATH).timestamp_to_token(timestamp)
 
-        img = sensors.images[CameraChannel.CAM_R0].as_numpy
 
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
+class FrameCountMismatch(ValueError):
+    """A resumed export would not have the same frames as the videos it completes."""
 
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
 
-        writer.append_data(img)
+class FrameLoader:
+    """Fetches scenario iterations and renders the frame of every output stream.
 
-print(f"Saved video to: {output_path}")
+    Camera images go through one FrameNormalizer per camera; proxy tiles and
+    mosaic canvases are rendered into pooled buffers, so steady-state export
+    allocates no per-frame arrays. Every frame handed out must come back
+    through release() once its writer is done with it. Iterations that are
+    skipped record their unavailable cameras in `skipped_cameras`.
 
-output_path = outfolder + f"{NAME}R1.mp4"
-fps = 20  # LiDAR is ~20 Hz
+    With `jpegs` (a JpegFiles), the full-size camera streams get each
+    image's raw JPEG bytes instead, and the scenario is only asked for the
+    cameras the proxies, mosaic and archive still need decoded. With
+    `archive`, every camera is resized straight into a pooled frame record.
+    `replay` ({iteration: cameras}) are iterations skipped without loading,
+    so a resumed export drops the same frames as the run it completes.
+    """
 
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
-        try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_R1, LidarChannel.MERGED_PC],
+    def __init__(self, scenario, cameras, mosaic=False, proxies=(), profile=NULL_PROFILE, jpegs=None,
+                 archive=False, replay=None):
+        self.scenario = scenario
+        self.profile = profile
+        self.cameras = list(cameras)  # cameras whose full-size video is written
+        self.mosaic = mosaic
+        self.proxies = list(proxies)
+        self.archive = archive
+        self.jpegs = jpegs
+        self.passthrough = self.cameras if jpegs is not None else []  # written from JPEG bytes
+        self.decoded = [cam for cam in self.cameras if cam not in self.passthrough]  # written from arrays
+        if mosaic or archive:
+            self.load_cameras = CAMERAS  # the mosaic and the archive need every camera
+        else:
+            self.load_cameras = {cam: ch for cam, ch in CAMERAS.items() if cam in self.decoded or cam in proxies}
+        self.normalizers = {cam: FrameNormalizer() for cam in self.load_cameras}
+        self.tile_pools = {cam: BufferPool((h, w, 3)) for cam, (w, h) in TILE_SIZES.items()}
+        width, height = MOSAIC_SIZE
+        self.mosaic_pool = BufferPool((height, width, 3), zeroed=True)  # gaps in the grid stay black
+        self.archive_layout = ArchiveLayout(ARCHIVE_TILE_SIZES)
+        self.archive_pool = BufferPool((self.archive_layout.record_size,), zeroed=True)
+        self.skipped_cameras = {}  # iteration -> cameras without an image
+        self.replay = replay or {}
+
+        self._release = {cam: self.normalizers[cam].release for cam in self.decoded}
+        self._release.update({cam: self._keep for cam in self.passthrough})
+        self._release.update({proxy_stream(cam): self.tile_pools[cam].release for cam in self.proxies})
+        self._release[MOSAIC_STREAM] = self.mosaic_pool.release
+        self._release[ARCHIVE_STREAM] = self.archive_pool.release
+
+    def load(self, iteration):
+        """{stream: frame} for one iteration, or None when its sensor data is missing.
+
+        Frames are HxWx3 uint8 arrays, or JPEG bytes for passthrough streams.
+        """
+        profile = self.profile
+        if iteration in self.replay:
+            self.skipped_cameras[iteration] = self.replay[iteration]
+            profile.skip(iteration, "skipped by the run being resumed", self.replay[iteration])
+            return None
+        jpegs = {}
+        if self.passthrough:
+            with profile.stage("read"):
+                jpegs, missing = self.jpegs.read(self.passthrough, iteration)
+                self.jpegs.hint(self.passthrough, iteration + READAHEAD_ITERATIONS * EXPORT_ITERATION_STEP)
+            if missing:
+                self.skipped_cameras[iteration] = missing
+                profile.skip(iteration, "JPEG missing", missing)
+                print(f"Skipping frame {iteration}: no JPEG for {', '.join(missing)}")
+                return None
+        if self.load_cameras:
+            try:
+                with profile.stage("fetch"):
+                    sensors = self.scenario.get_sensors_at_iteration(iteration, list(self.load_cameras.values()))
+            except Exception as e:
+                self.skipped_cameras[iteration] = self._missing_cameras(iteration)
+                profile.skip(iteration, f"{type(e).__name__}: {e}", self.skipped_cameras[iteration])
+                print(f"Skipping frame {iteration} due to missing sensor data: {e}")
+                return None
+        images = {}
+        for cam, channel in self.load_cameras.items():
+            with profile.stage("decode", cam):
+                img = sensors.images[channel].as_numpy
+            with profile.stage("normalize", cam):
+                images[cam] = self.normalizers[cam](img)
+
+        tiles = {}
+        for cam in (MOSAIC_LAYOUT if self.mosaic else self.proxies):
+            with profile.stage("resize", cam):
+                tiles[cam] = self.tile_pools[cam].acquire()
+                cv2.resize(images[cam], TILE_SIZES[cam], dst=tiles[cam], interpolation=cv2.INTER_AREA)
+
+        frames = {cam: images[cam] for cam in self.decoded}
+        frames.update(jpegs)
+        for cam in self.proxies:
+            frames[proxy_stream(cam)] = tiles[cam]
+        if self.mosaic:
+            with profile.stage("composite", MOSAIC_STREAM):
+                canvas = self.mosaic_pool.acquire()
+                for cam, (x, y) in MOSAIC_LAYOUT.items():
+                    w, h = TILE_SIZES[cam]
+                    canvas[y:y + h, x:x + w] = tiles[cam]
+            frames[MOSAIC_STREAM] = canvas
+        if self.archive:
+            with profile.stage("archive", ARCHIVE_STREAM):
+                record = self.archive_pool.acquire()
+                for cam, view in self.archive_layout.views(record).items():
+                    tile = tiles.get(cam)
+                    if tile is not None and tile.shape == view.shape:
+                        view[...] = tile
+                    else:
+                        cv2.resize(images[cam], ARCHIVE_TILE_SIZES[cam], dst=view, interpolation=cv2.INTER_AREA)
+            frames[ARCHIVE_STREAM] = record
+
+        # Hand back intermediates that no writer will see
+        for cam, tile in tiles.items():
+            if cam not in self.proxies:
+                self.tile_pools[cam].release(tile)
+        for cam, img in images.items():
+            if cam not in self.decoded:
+                self.normalizers[cam].release(img)
+        return frames
+
+    def release(self, stream, frame):
+        self._release[stream](frame)
+
+    def _keep(self, frame):
+        pass  # JPEG bytes are not pooled
+
+    def _missing_cameras(self, iteration):
+        """Cameras whose image can't be fetched on its own (only probed for skipped iterations)."""
+        missing = []
+        for cam, channel in self.load_cameras.items():
+            try:
+                self.scenario.get_sensors_at_iteration(iteration, [channel])
+            except Exception:
+                missing.append(cam)
+        return missing
+
+
+def encode_stream(writer, frames, release, profile=NULL_PROFILE, stream=""):
+    """Append frames from a queue to one writer until the None sentinel arrives.
+
+    Each frame is passed to `release` once written so its buffer can be reused.
+
+    If the writer fails the queue is still drained so the producer never
+    blocks on a full queue; the error is raised once the sentinel is seen.
+    Returns the number of frames written.
+    """
+    error = None
+    written = 0
+    while True:
+        img = frames.get()
+        if img is None:
+            break
+        if error is None:
+            try:
+                with profile.stage("encode", stream):
+                    writer.append_data(img)
+                written += 1
+            except Exception as e:
+                error = e
+        release(img)
+    if error is not None:
+        raise error
+    return written
+
+
+def video_paths(name, outfolder, cameras=CAMERAS, mosaic=False, proxies=(), archive=False):
+    """Final output path of each camera, proxy and mosaic video (and the frame archive) for a log."""
+    streams = list(cameras) + [proxy_stream(cam) for cam in proxies] + ([MOSAIC_STREAM] if mosaic else [])
+    streams += [ARCHIVE_STREAM] if archive else []
+    return {stream: os.path.join(outfolder, video_filename(name, stream)) for stream in streams}
+
+
+def open_writer(stream, path, encoder=ENCODER, passthrough=False):
+    """imageio writer for a stream using the run's encoder settings.
+
+    Mosaic and proxy frames are written at their exact display size
+    (macro_block_size=1 keeps imageio from padding 180/540 rows to 192/544),
+    and proxies use a short GOP so the labelers can seek them quickly.
+    Passthrough camera streams get a JpegPipeWriter and the frame archive
+    an ArchiveWriter instead.
+    """
+    if passthrough:
+        return JpegPipeWriter(path, fps, encoder)
+    if stream == ARCHIVE_STREAM:
+        return ArchiveWriter(path, ARCHIVE_TILE_SIZES)
+    if stream in CAMERAS:
+        return imageio.get_writer(path, fps=fps, **writer_kwargs(encoder))
+    gop = PROXY_GOP if stream != MOSAIC_STREAM else None
+    return imageio.get_writer(path, fps=fps, macro_block_size=1, **writer_kwargs(encoder, gop))
+
+
+def export_videos(scenario, name, outfolder, cameras=CAMERAS, mosaic=False, proxies=(), archive=False,
+                  manifest=None, encoder=ENCODER, sidecar=None, profile=NULL_PROFILE, jpegs=None,
+                  replay=None, expected_frames=None, loader_workers=LOADER_WORKERS, queue_size=ENCODE_QUEUE_SIZE):
+    """Write one mp4 per camera, plus optional proxies, mosaic and frame archive, walking the scenario once.
+
+    A pool of loader threads fetches and converts iterations ahead of the
+    writers; results are consumed in iteration order and fanned out to one
+    encoder thread per camera through bounded queues, so a slow encoder
+    applies backpressure to the loaders instead of buffering the whole log.
+
+    Videos are written under a .partial name and renamed into place only
+    once complete; each rename is recorded in `manifest` when given. A
+    SidecarWriter passed as `sidecar` gets every iteration's outcome and is
+    saved with the videos. An ExportProfile passed as `profile` times every
+    stage; "load_wait" and "queue_put" show whether the loaders or the
+    encoders are the bottleneck. With `jpegs` (a JpegFiles), the full-size
+    camera videos are piped straight from the sensor JPEGs.
+
+    When resuming, `replay` is the skip set of the finished videos (see
+    FrameLoader) and `expected_frames` their frame count; if any new video
+    comes out with a different count nothing is kept and FrameCountMismatch
+    is raised, since the views would no longer play in lockstep.
+    """
+    output_paths = video_paths(name, outfolder, cameras, mosaic, proxies, archive)
+    temp_paths = {stream: partial_path(path) for stream, path in output_paths.items()}
+    iterations = range(FIRST_EXPORT_ITERATION, scenario.get_number_of_iterations(), EXPORT_ITERATION_STEP)
+    loader = FrameLoader(scenario, cameras, mosaic, proxies, profile, jpegs, archive, replay)
+
+    try:
+        with ExitStack() as stack:
+            writers = {}
+            for stream, path in temp_paths.items():
+                writers[stream] = open_writer(stream, path, encoder, stream in loader.passthrough)
+                # imageio's __exit__ skips close() while an exception is in flight, which would
+                # leave ffmpeg running and the .partial file appearing after the cleanup below
+                stack.callback(writers[stream].close)
+            queues = {stream: queue.Queue(maxsize=queue_size) for stream in writers}
+            encoders = stack.enter_context(
+                ThreadPoolExecutor(max_workers=len(writers), initializer=profile.thread_init)
             )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
-
-        img = sensors.images[CameraChannel.CAM_R1].as_numpy
-
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
-
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
-
-        writer.append_data(img)
-
-print(f"Saved video to: {output_path}")
-
-output_path = outfolder + f"{NAME}R2.mp4"
-fps = 20  # LiDAR is ~20 Hz
-
-with imageio.get_writer(output_path, fps=fps, codec="libx264") as writer:
-    for i in tqdm(range(1, num_frames, 2), desc="Writing frames"):
+            encoder_futures = {
+                stream: encoders.submit(
+                    encode_stream, writers[stream], queues[stream], partial(loader.release, stream), profile, stream
+                )
+                for stream in writers
+            }
+            try:
+                with ThreadPoolExecutor(max_workers=loader_workers, initializer=profile.thread_init) as loaders:
+                    # Keep a bounded window of in-flight loads and drain it in order
+                    todo = iter(iterations)
+                    pending = deque(
+                        loaders.submit(loader.load, i)
+                        for i in islice(todo, 2 * loader_workers)
+                    )
+                    for iteration in tqdm(iterations, desc="Writing frames"):
+                        with profile.stage("load_wait"):
+                            images = pending.popleft().result()
+                        nxt = next(todo, None)
+                        if nxt is not None:
+                            pending.append(loaders.submit(loader.load, nxt))
+                        if sidecar is not None:
+                            sidecar.add(iteration, images is not None, loader.skipped_cameras.get(iteration, ()))
+                        if images is None:
+                            continue
+                        with profile.stage("queue_put"):
+                            for stream, q in queues.items():
+                                q.put(images[stream])
+            finally:
+                for q in queues.values():
+                    q.put(None)
+            frame_counts = {stream: future.result() for stream, future in encoder_futures.items()}
+        if expected_frames is not None and set(frame_counts.values()) != {expected_frames}:
+            raise FrameCountMismatch(f"{name}: resumed videos have {sorted(set(frame_counts.values()))} frames, "
+                                     f"the finished ones {expected_frames}")
+    except BaseException:
+        for path in temp_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    for stream, path in output_paths.items():
+        os.replace(temp_paths[stream], path)
+        if manifest is not None:
+            manifest.mark_complete(stream, path, frame_counts[stream])
+        print(f"Saved video to: {path}")
+    if sidecar is not None:
+        sidecar.save()
+    return output_paths
+
+
+def export_log(db_path, outfolder=outfolder, overwrite=False, mosaic=MOSAIC_EXPORT, proxies=PROXY_EXPORT,
+               archive=ARCHIVE_EXPORT, encoder=ENCODER, profile=PROFILE_EXPORT, cprofile=PROFILE_CPROFILE,
+               jpeg_passthrough=JPEG_PASSTHROUGH):
+    """Build the scenario for one log DB and export the videos it still needs.
+
+    Videos already recorded as complete in the log's manifest (same source
+    DB, file intact) are skipped unless `overwrite` is set. With `profile`
+    the run's timings are written next to the videos, even if it fails.
+    With `jpeg_passthrough` the full-size camera videos are encoded by
+    ffmpeg straight from the sensor_blobs JPEGs.
+    """
+    name = log_name(db_path)
+    manifest = ExportManifest.load(outfolder, name, db_path)
+    all_paths = video_paths(name, outfolder, mosaic=mosaic, proxies=CAMERAS if proxies else (), archive=archive)
+    todo = all_paths if overwrite else manifest.pending(all_paths)
+    if not todo:
+        print(f"All videos for {name} are up to date")
+        return all_paths
+    replay = expected_frames = None
+    if len(todo) < len(all_paths):
+        replay, expected_frames = resume_state(name, outfolder, manifest, [k for k in all_paths if k not in todo])
+        if replay is None:
+            todo = all_paths
+        else:
+            print(f"Resuming {name}: {len(all_paths) - len(todo)} of {len(all_paths)} videos already complete")
+
+    profile = ExportProfile(name, cprofile) if profile or cprofile else NULL_PROFILE
+    try:
         try:
-            sensors = scenario.get_sensors_at_iteration(
-                i,
-                [CameraChannel.CAM_R2, LidarChannel.MERGED_PC],
-            )
-        except Exception as e:
-            print(f"Skipping frame {i} due to missing sensor data: {e}")
-            continue
-
-        img = sensors.images[CameraChannel.CAM_R2].as_numpy
-
-        # Ensure uint8
-        if img.dtype != "uint8":
-            img = img.astype("uint8")
-
-        # Ensure 3 channels
-        if img.ndim == 2:
-            img = np.stack([img]*3, axis=-1)
-        elif img.shape[2] == 4:
-            img = img[:, :, :3]
-
-        writer.append_data(img)
-
-print(f"Saved video to: {output_path}")
+            _export_pending(db_path, name, outfolder, todo, manifest, encoder, profile, jpeg_passthrough,
+                            replay, expected_frames)
+        except FrameCountMismatch as e:
+            print(f"{e}; re-exporting every video")
+            _export_pending(db_path, name, outfolder, all_paths, manifest, encoder, profile, jpeg_passthrough)
+    finally:
+        if profile.enabled:
+            profile.write(outfolder)
+    return all_paths
+
+
+def resume_state(name, outfolder, manifest, done):
+    """({iteration: cameras} skipped by the finished videos, their frame count), or (None, None) if unusable.
+
+    The finished videos must agree on their frame count and the frame index
+    sidecar written with them must account for exactly those frames;
+    otherwise the resumed videos can't be lined up with them.
+    """
+    counts = set(manifest.frame_counts(done).values())
+    if len(counts) != 1:
+        print(f"Finished videos of {name} disagree on their frame count ({sorted(counts, key=str)}); "
+              f"re-exporting every video")
+        return None, None
+    frames = counts.pop()
+    try:
+        sidecar = FrameSidecar.load(sidecar_path(outfolder, name))
+    except (OSError, ValueError) as e:
+        print(f"No usable frame index for {name} ({e}); re-exporting every video")
+        return None, None
+    if len(sidecar) != frames:
+        print(f"Frame index of {name} has {len(sidecar)} frames but the videos {frames}; re-exporting every video")
+        return None, None
+    return dict(sidecar.skipped()), frames
+
+
+def _export_pending(db_path, name, outfolder, todo, manifest, encoder, profile, jpeg_passthrough,
+                    replay=None, expected_frames=None):
+    with profile.stage("scenario"):
+        scenario = build_full_log_scenario(db_path)
+    print(f"Number of frames in scenario: {scenario.get_number_of_iterations()}")
+    cameras = {cam: channel for cam, channel in CAMERAS.items() if cam in todo}
+    proxy_cams = [cam for cam in CAMERAS if proxy_stream(cam) in todo]
+
+    index = LidarIndex.load(db_path)
+    lidar_indices = index.full_log_indices()
+    sidecar = jpegs = None
+    if len(lidar_indices) == scenario.get_number_of_iterations():
+        if replay is None:
+            # <name>.frames.bin maps each video frame to its iteration and LiDAR frame; a resume keeps the first
+            # run's, which its replayed skip set matches
+            sidecar = SidecarWriter(sidecar_path(outfolder, name), index, lidar_indices)
+        if jpeg_passthrough and cameras:
+            with profile.stage("jpeg_index"):
+                files = camera_image_files(db_path, [index.timestamps[i] for i in lidar_indices],
+                                           {cam: channel.value for cam, channel in cameras.items()})
+            jpegs = JpegFiles(NUPLAN_SENSOR_ROOT, files)
+    else:
+        print(f"Scenario has {scenario.get_number_of_iterations()} iterations but the LiDAR index expects "
+              f"{len(lidar_indices)}; not writing the frame index or passing JPEGs through")
+    export_videos(scenario, name, outfolder, cameras, mosaic=MOSAIC_STREAM in todo, proxies=proxy_cams,
+                  archive=ARCHIVE_STREAM in todo, manifest=manifest, encoder=encoder, sidecar=sidecar,
+                  profile=profile, jpegs=jpegs, replay=replay, expected_frames=expected_frames)
+
+
+if __name__ == "__main__":
+    print_log_summary(TEST_DB_FILE)
+
+    # Example usage
+    TEST_TIMESTAMP = first_lidar_frame(TEST_DB_FILE)[1]
+    tk = timestamp_to_token(TEST_TIMESTAMP)
+    print(f"Timestamp {TEST_TIMESTAMP} corresponds to token {tk}")
+
+    export_log(TEST_DB_FILE)
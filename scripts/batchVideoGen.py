@@ -0,0 +1,144 @@
+#exports camera videos for many logs at once, spreading logs across a process pool
+#usage: python batchVideoGen.py [dir | glob | manifest.txt | log.db ...] --workers 4
+
+import argparse
+import csv
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import autoVideoGen
+from encoderSettings import add_encoder_args, settings_from_args
+from exportManifest import ExportManifest
+from integrityScan import broken_logs, load_report
+
+
+def expand_inputs(inputs):
+    """Resolve directories, globs, .db paths and manifest files to a sorted list of log DBs.
+
+    A manifest is any other file: one DB path or log name per line, '#' for
+    comments. Bare log names are looked up in the nuPlan split folder.
+    """
+    db_paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            db_paths.update(glob.glob(os.path.join(item, "*.db")))
+        elif item.endswith(".db"):
+            db_paths.update(glob.glob(item) if glob.has_magic(item) else [item])
+        elif glob.has_magic(item):
+            db_paths.update(p for p in glob.glob(item) if p.endswith(".db"))
+        else:
+            with open(item, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("#") or not line:
+                        continue
+                    if not line.endswith(".db"):
+                        line = os.path.join(autoVideoGen.NUPLAN_SPLIT_ROOT, line + ".db")
+                    db_paths.add(line)
+    return sorted(db_paths)
+
+
+def outputs_complete(db_path, outfolder):
+    """True when the log's manifest records every video as complete and up to date."""
+    name = autoVideoGen.log_name(db_path)
+    manifest = ExportManifest.load(outfolder, name, db_path)
+    paths = autoVideoGen.video_paths(
+        name, outfolder,
+        mosaic=autoVideoGen.MOSAIC_EXPORT,
+        proxies=autoVideoGen.CAMERAS if autoVideoGen.PROXY_EXPORT else (),
+        archive=autoVideoGen.ARCHIVE_EXPORT,
+    )
+    return not manifest.pending(paths)
+
+
+def run_log(db_path, outfolder, overwrite, encoder, profile=False, cprofile=False, jpeg_passthrough=False):
+    """Export one log in a worker process and return (log, status, seconds, detail)."""
+    name = autoVideoGen.log_name(db_path)
+    started = time.time()
+    if not os.path.exists(db_path):
+        return name, "skipped", 0.0, f"DB not found: {db_path}"
+    if not overwrite and outputs_complete(db_path, outfolder):
+        return name, "skipped", 0.0, "outputs already complete"
+    try:
+        autoVideoGen.export_log(db_path, outfolder, overwrite, encoder=encoder, profile=profile, cprofile=cprofile,
+                                jpeg_passthrough=jpeg_passthrough)
+    except Exception as e:
+        traceback.print_exc()
+        return name, "failed", time.time() - started, f"{type(e).__name__}: {e}"
+    return name, "succeeded", time.time() - started, ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export camera videos for many nuPlan logs.")
+    parser.add_argument("inputs", nargs="*", default=[autoVideoGen.NUPLAN_SPLIT_ROOT],
+                        help="log DB directories, globs, .db files or manifest files (default: the mini split)")
+    parser.add_argument("--outfolder", default=autoVideoGen.outfolder, help="where the videos are written")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="number of logs exported in parallel")
+    parser.add_argument("--summary", default=None,
+                        help="CSV summary path (default: <outfolder>/batch_summary.csv)")
+    parser.add_argument("--overwrite", action="store_true", help="re-export logs whose videos are already complete")
+    parser.add_argument("--profile", action="store_true",
+                        help="write <log>.profile.json/.csv with per-stage timings, skipped frames and peak RSS")
+    parser.add_argument("--cprofile", action="store_true", help="also dump a cProfile of each log to <log>.prof")
+    parser.add_argument("--jpeg-passthrough", action="store_true",
+                        help="encode the full-size camera videos straight from the sensor_blobs JPEGs")
+    parser.add_argument("--scan-report", default=None,
+                        help="integrityScan.py report; logs it marks as broken are skipped up front")
+    parser.add_argument("--max-missing", type=float, default=0.05,
+                        help="with --scan-report, skip logs missing more than this fraction of camera images")
+    add_encoder_args(parser)
+    args = parser.parse_args()
+    encoder = settings_from_args(args)
+
+    db_paths = expand_inputs(args.inputs)
+    if not db_paths:
+        raise SystemExit(f"No log DBs found in {args.inputs}")
+    os.makedirs(args.outfolder, exist_ok=True)
+    summary_path = args.summary or os.path.join(args.outfolder, "batch_summary.csv")
+
+    results = []
+    if args.scan_report:
+        broken = broken_logs(load_report(args.scan_report), args.max_missing)
+        for db_path in db_paths:
+            name = autoVideoGen.log_name(db_path)
+            if name in broken:
+                results.append((name, "skipped", 0.0, broken[name]))
+                print(f"{name}: skipped ({broken[name]})")
+        db_paths = [p for p in db_paths if autoVideoGen.log_name(p) not in broken]
+    print(f"Exporting {len(db_paths)} logs with {args.workers} workers")
+
+    prescreened = len(results)
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(run_log, db_path, args.outfolder, args.overwrite, encoder,
+                            args.profile, args.cprofile, args.jpeg_passthrough): db_path
+                for db_path in db_paths
+            }
+            for future in as_completed(futures):
+                try:
+                    name, status, seconds, detail = future.result()
+                except Exception as e:  # the worker process died (segfault, OOM kill) and broke the pool
+                    name, status, seconds, detail = (autoVideoGen.log_name(futures[future]), "failed", 0.0,
+                                                     f"{type(e).__name__}: {e}")
+                results.append((name, status, seconds, detail))
+                print(f"[{len(results) - prescreened}/{len(db_paths)}] {name}: {status} ({seconds:.1f}s) {detail}")
+    finally:
+        results.sort()
+        with open(summary_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["log", "status", "seconds", "detail"])
+            for name, status, seconds, detail in results:
+                writer.writerow([name, status, f"{seconds:.1f}", detail])
+
+    counts = {status: sum(1 for r in results if r[1] == status) for status in ("succeeded", "failed", "skipped")}
+    print(f"Done: {counts['succeeded']} succeeded, {counts['failed']} failed, {counts['skipped']} skipped")
+    print(f"Summary written to: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#benchmark: encode a synthetic frame sequence under each x264 preset and report throughput, size and seek latency
+#usage: python benchEncoder.py --presets ultrafast veryfast medium --crf 23 --gop 20 --frames 300
+
+import argparse
+import csv
+import itertools
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import imageio
+import numpy as np
+
+from encoderSettings import add_encoder_args, settings_from_args, writer_kwargs
+from videoSeek import SeekableCapture
+
+DEFAULT_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"]
+
+
+def synthetic_frames(n, width, height, seed=0):
+    """Camera-like frames: a smooth background, a few moving blocks and sensor noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    background = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    background = background.astype(np.uint8)
+    for i in range(n):
+        frame = background.copy()
+        for k in range(4):
+            bx = (i * (3 + k) * 4 + k * width // 4) % (width - 80)
+            by = (k * height // 5 + i * (k + 1)) % (height - 80)
+            frame[by:by + 80, bx:bx + 80] = (60 * k, 255 - 50 * k, 128)
+        noise = rng.integers(-6, 7, size=frame.shape, dtype=np.int16)
+        yield np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+
+def bench_preset(frames, count, settings, fps, seeks, workdir):
+    """Encode `count` frames cycling through `frames` with `settings`; return a result row."""
+    path = os.path.join(workdir, f"bench_{settings['preset'] or 'default'}.mp4")
+    started = time.perf_counter()
+    with imageio.get_writer(path, fps=fps, macro_block_size=1, **writer_kwargs(settings)) as writer:
+        for frame in itertools.islice(itertools.cycle(frames), count):
+            writer.append_data(frame)
+    encode_seconds = time.perf_counter() - started
+
+    cap = SeekableCapture(path)  # builds the keyframe index outside the timed section
+    targets = random.Random(0).sample(range(cap.frame_count), min(seeks, cap.frame_count))
+    latencies = []
+    for index in targets:
+        started = time.perf_counter()
+        cap.read_at(index)
+        latencies.append(time.perf_counter() - started)
+    cap.release()
+
+    return {
+        "preset": settings["preset"] or "default",
+        "fps": count / encode_seconds,
+        "size_mb": os.path.getsize(path) / 1e6,
+        "keyframes": len(cap.keyframes) if cap.keyframes is not None else "",
+        "seek_ms_mean": statistics.mean(latencies) * 1e3,
+        "seek_ms_p95": sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare x264 presets on synthetic camera frames.")
+    parser.add_argument("--presets", nargs="+", default=DEFAULT_PRESETS)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--distinct-frames", type=int, default=20,
+                        help="synthetic frames generated and cycled through (memory: ~6 MB each at 1080p)")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=20)
+    parser.add_argument("--seeks", type=int, default=50, help="random frame reads timed per preset")
+    parser.add_argument("--csv", default=None, help="also write the results to this CSV file")
+    add_encoder_args(parser)
+    args = parser.parse_args()
+    if args.preset is not None:
+        parser.error("--preset is not used here; list the presets to compare with --presets")
+    base = settings_from_args(args)
+
+    distinct = max(1, min(args.distinct_frames, args.frames))
+    print(f"Generating {distinct} synthetic {args.width}x{args.height} frames, cycled to {args.frames}")
+    frames = list(synthetic_frames(distinct, args.width, args.height))
+
+    rows = []
+    print(f"{'preset':<10} {'enc fps':>8} {'size MB':>8} {'keyframes':>9} {'seek ms':>8} {'p95 ms':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for preset in args.presets:
+            row = bench_preset(frames, args.frames, dict(base, preset=preset), args.fps, args.seeks, workdir)
+            rows.append(row)
+            print(f"{row['preset']:<10} {row['fps']:>8.1f} {row['size_mb']:>8.2f} {row['keyframes']:>9} "
+                  f"{row['seek_ms_mean']:>8.1f} {row['seek_ms_p95']:>7.1f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Results written to: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
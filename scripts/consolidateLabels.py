@@ -0,0 +1,130 @@
+#consolidates every per-log label CSV into one Parquet dataset partitioned by log
+#usage: python consolidateLabels.py outputs/ labels_dataset/ --db-root <nuplan split dir> --video-dir <videos>
+#read back lazily with pyarrow.dataset.dataset("labels_dataset", format="parquet", partitioning="hive")
+
+import argparse
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from frameSidecar import FrameSidecar, sidecar_path
+from labelCsv import iter_label_files, read_label_rows
+from lidarIndex import LidarIndex
+
+DEFAULT_DB_ROOT = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/nuplan-v1.1/splits/mini"
+
+SCHEMA = pa.schema([
+    ("log", pa.string()),
+    ("start_frame", pa.int32()),
+    ("end_frame", pa.int32()),
+    ("label", pa.string()),
+    ("commentary", pa.string()),
+    ("username", pa.string()),
+    ("start_token", pa.string()),
+    ("start_timestamp", pa.int64()),
+    ("end_token", pa.string()),
+    ("end_timestamp", pa.int64()),
+    ("source_row", pa.int32()),
+])
+
+
+class FrameResolver:
+    """Maps a log's video frame numbers to LiDAR tokens and timestamps (None if unknown).
+
+    Uses the export's frame index sidecar when `sidecar` exists, since the
+    exporter drops iterations with missing sensor data; otherwise falls back
+    to LidarIndex's sampling, which is only right if nothing was dropped.
+    """
+
+    def __init__(self, db_path, sidecar=None):
+        self.index = None
+        self.sidecar = None
+        self.frames = range(0)
+        if sidecar and os.path.exists(sidecar):
+            self.sidecar = FrameSidecar.load(sidecar)
+        elif db_path and os.path.exists(db_path):
+            self.index = LidarIndex.load(db_path)
+            self.frames = self.index.video_frame_indices()
+
+    @property
+    def available(self):
+        return self.sidecar is not None or self.index is not None
+
+    def resolve(self, frame):
+        if self.sidecar is not None:
+            if not 0 <= frame < len(self.sidecar):
+                return None, None
+            record = self.sidecar.frame(frame)
+            return record["token"], record["timestamp"]
+        if self.index is None or not 0 <= frame < len(self.frames):
+            return None, None
+        i = self.frames[frame]
+        return self.index.token(i), self.index.timestamps[i]
+
+
+def log_batches(label_folder, db_root, video_dir=None):
+    """Yield one RecordBatch per log CSV, reading each file as a stream."""
+    for log, csv_path in iter_label_files(label_folder):
+        resolver = FrameResolver(os.path.join(db_root, f"{log}.db") if db_root else None,
+                                 sidecar_path(video_dir, log) if video_dir else None)
+        if not resolver.available:
+            print(f"{log}: log DB not found, LiDAR columns left empty")
+        elif resolver.sidecar is None:
+            print(f"{log}: WARNING no frame index sidecar, assuming no frames were skipped in export")
+        columns = {name: [] for name in SCHEMA.names}
+        for source_row, row in enumerate(read_label_rows(csv_path)):
+            start_token, start_ts = resolver.resolve(row["start_frame"])
+            end_token, end_ts = resolver.resolve(row["end_frame"])
+            values = dict(row, log=log, source_row=source_row,
+                          start_token=start_token, start_timestamp=start_ts,
+                          end_token=end_token, end_timestamp=end_ts)
+            for name in SCHEMA.names:
+                columns[name].append(values[name])
+        if columns["log"]:
+            print(f"{log}: {len(columns['log'])} labels")
+            yield pa.record_batch([columns[name] for name in SCHEMA.names], schema=SCHEMA)
+
+
+def dataset_partitions(dataset_dir):
+    """Paths of the log=<name> partitions of a previous dataset in `dataset_dir` (none if it doesn't exist).
+
+    Refuses to touch a directory holding anything else, so a mistyped
+    output path is never wiped.
+    """
+    if not os.path.isdir(dataset_dir):
+        return []
+    entries = list(os.scandir(dataset_dir))
+    others = [e.name for e in entries if not (e.is_dir(follow_symlinks=False) and e.name.startswith("log="))]
+    if others:
+        raise SystemExit(f"{dataset_dir} is not a label dataset (contains {', '.join(sorted(others)[:5])}); "
+                         f"pass an empty or new directory")
+    return [e.path for e in entries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consolidate label CSVs into a partitioned Parquet dataset.")
+    parser.add_argument("label_folder", help="folder with the labelers' per-log CSVs")
+    parser.add_argument("dataset_dir", help="output dataset directory: new, empty or a previous dataset (replaced)")
+    parser.add_argument("--db-root", default=DEFAULT_DB_ROOT, help="folder with the log DBs, for the LiDAR join")
+    parser.add_argument("--video-dir", default=None,
+                        help="exported videos, to map frames through their <log>.frames.bin sidecars")
+    args = parser.parse_args()
+
+    for partition in dataset_partitions(args.dataset_dir):
+        shutil.rmtree(partition)  # drop partitions of logs that no longer have labels
+
+    ds.write_dataset(
+        log_batches(args.label_folder, args.db_root, args.video_dir),
+        args.dataset_dir,
+        schema=SCHEMA,
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("log", pa.string())]), flavor="hive"),
+        existing_data_behavior="delete_matching",
+    )
+    print(f"Dataset written to: {args.dataset_dir}")
+
+
+if __name__ == "__main__":
+    main()
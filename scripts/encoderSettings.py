@@ -0,0 +1,84 @@
+#encoder settings for the exported videos, shared by the exporters and the encoder benchmark
+
+IMAGEIO_DEFAULT_CRF = 25  # what imageio's default quality=5 gives libx264
+
+# None means "leave it to imageio/ffmpeg" (imageio's default quality maps to CRF 25)
+ENCODER_DEFAULTS = {
+    "codec": "libx264",
+    "preset": None,    # x264 preset, e.g. ultrafast, veryfast, medium
+    "crf": None,       # constant rate factor 0-51 (lower = better quality, bigger files)
+    "bitrate": None,   # target bitrate such as "8M"; overrides crf
+    "gop": None,       # keyframe interval in frames
+    "pix_fmt": "yuv420p",
+    "threads": None,   # encoder threads per video (0 = ffmpeg decides)
+}
+
+
+def encoder_settings(**overrides):
+    """ENCODER_DEFAULTS with the given keys replaced; unknown keys are an error."""
+    unknown = set(overrides) - set(ENCODER_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown encoder settings: {sorted(unknown)}")
+    settings = dict(ENCODER_DEFAULTS)
+    settings.update(overrides)
+    return settings
+
+
+def writer_kwargs(settings, gop=None):
+    """Keyword arguments for imageio.get_writer from encoder settings.
+
+    `gop` overrides the configured keyframe interval (used for proxies).
+    """
+    params = []
+    kwargs = {"codec": settings["codec"], "pixelformat": settings["pix_fmt"]}
+    if settings["preset"]:
+        params += ["-preset", settings["preset"]]
+    if settings["bitrate"]:
+        kwargs["bitrate"] = settings["bitrate"]
+    elif settings["crf"] is not None:
+        kwargs["quality"] = None  # otherwise imageio adds its own -crf
+        params += ["-crf", str(settings["crf"])]
+    gop = gop or settings["gop"]
+    if gop:
+        params += ["-g", str(gop)]
+    if settings["threads"] is not None:
+        params += ["-threads", str(settings["threads"])]
+    if params:
+        kwargs["ffmpeg_params"] = params
+    return kwargs
+
+
+def ffmpeg_output_args(settings, gop=None):
+    """The same encoder options as writer_kwargs, as output arguments for an ffmpeg command line."""
+    args = ["-c:v", settings["codec"], "-pix_fmt", settings["pix_fmt"]]
+    if settings["bitrate"]:
+        args += ["-b:v", settings["bitrate"]]
+    else:
+        args += ["-crf", str(settings["crf"] if settings["crf"] is not None else IMAGEIO_DEFAULT_CRF)]
+    if settings["preset"]:
+        args += ["-preset", settings["preset"]]
+    gop = gop or settings["gop"]
+    if gop:
+        args += ["-g", str(gop)]
+    if settings["threads"] is not None:
+        args += ["-threads", str(settings["threads"])]
+    return args
+
+
+def add_encoder_args(parser):
+    """Add --preset/--crf/--bitrate/--gop/--pix-fmt/--encoder-threads to an argparse parser."""
+    group = parser.add_argument_group("encoder")
+    group.add_argument("--codec", default=ENCODER_DEFAULTS["codec"])
+    group.add_argument("--preset", default=None, help="x264 preset (e.g. ultrafast, veryfast, medium)")
+    group.add_argument("--crf", type=int, default=None, help="constant rate factor, 0-51")
+    group.add_argument("--bitrate", default=None, help="target bitrate, e.g. 8M (overrides --crf)")
+    group.add_argument("--gop", type=int, default=None, help="keyframe interval in frames")
+    group.add_argument("--pix-fmt", default=ENCODER_DEFAULTS["pix_fmt"])
+    group.add_argument("--encoder-threads", type=int, default=None, help="encoder threads per video")
+
+
+def settings_from_args(args):
+    return encoder_settings(
+        codec=args.codec, preset=args.preset, crf=args.crf, bitrate=args.bitrate,
+        gop=args.gop, pix_fmt=args.pix_fmt, threads=args.encoder_threads,
+    )
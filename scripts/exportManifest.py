@@ -0,0 +1,104 @@
+#per-log export manifest: which camera videos are finished, and from which source DB
+
+import hashlib
+import json
+import os
+import time
+
+HASH_CHUNK = 8 * 1024 * 1024
+
+
+def file_sha1(path):
+    """SHA-1 of a file, read in large chunks."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ExportManifest:
+    """JSON record of completed outputs for one log, stored as <outfolder>/<log>.manifest.json.
+
+    Each finished output is recorded with its frame count and the hash of the
+    source DB it was generated from. An output counts as complete only if the
+    file is still there with the recorded size and the DB hash still matches.
+    The DB is re-hashed only when its size or mtime changed since the last run.
+    """
+
+    def __init__(self, path, db_path, data):
+        self.path = path
+        self.db_path = db_path
+        self.data = data
+
+    @classmethod
+    def load(cls, outfolder, name, db_path):
+        path = os.path.join(outfolder, f"{name}.manifest.json")
+        data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {path}: {e}")
+        data.setdefault("log", name)
+        data.setdefault("outputs", {})
+        manifest = cls(path, db_path, data)
+        manifest._refresh_source()
+        return manifest
+
+    def _refresh_source(self):
+        stat = os.stat(self.db_path)
+        source = self.data.get("source", {})
+        if source.get("size") != stat.st_size or source.get("mtime_ns") != stat.st_mtime_ns:
+            source = {
+                "path": os.path.abspath(self.db_path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha1": file_sha1(self.db_path),
+            }
+            self.data["source"] = source
+            self.save()
+
+    @property
+    def source_hash(self):
+        return self.data["source"]["sha1"]
+
+    def is_complete(self, key, path):
+        """True if output `key` was finished from the current DB and `path` is intact."""
+        entry = self.data["outputs"].get(key)
+        if entry is None or entry.get("source_sha1") != self.source_hash:
+            return False
+        return os.path.exists(path) and os.path.getsize(path) == entry.get("size")
+
+    def pending(self, paths):
+        """Subset of {key: path} that still has to be (re)generated."""
+        return {key: path for key, path in paths.items() if not self.is_complete(key, path)}
+
+    def frame_counts(self, keys):
+        """{key: recorded frame count} for the given outputs."""
+        return {key: self.data["outputs"][key].get("frames") for key in keys}
+
+    def mark_complete(self, key, path, frames):
+        """Record a finished output and persist the manifest immediately."""
+        self.data["outputs"][key] = {
+            "file": os.path.basename(path),
+            "frames": frames,
+            "size": os.path.getsize(path),
+            "source_sha1": self.source_hash,
+            "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def partial_path(path):
+    """Temporary name an output is written under until it is complete (keeps the extension)."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.partial{ext}"
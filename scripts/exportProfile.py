@@ -0,0 +1,129 @@
+#opt-in timing of the export pipeline: per-stage and per-stream totals, skipped frames, peak RSS, optional cProfile
+
+import cProfile
+import csv
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB on Linux
+
+
+class NullProfile:
+    """Stand-in used when profiling is off; every hook is a no-op."""
+
+    enabled = False
+
+    def stage(self, name, stream=""):
+        return nullcontext()
+
+    def add(self, name, stream, seconds):
+        pass
+
+    def skip(self, iteration, reason, cameras=()):
+        pass
+
+    def thread_init(self):
+        pass
+
+
+NULL_PROFILE = NullProfile()
+
+
+class ExportProfile:
+    """Accumulates wall time per (stage, stream) across the loader and encoder threads.
+
+    Stages are timed with `with profile.stage(name, stream):`; totals and call
+    counts are kept under a lock, so the per-call cost is two perf_counter
+    reads. With `cprofile`, the calling thread and every pool thread started
+    with `initializer=profile.thread_init` get their own cProfile.Profile,
+    merged into one .prof dump by write().
+    """
+
+    enabled = True
+
+    def __init__(self, name, cprofile=False):
+        self.name = name
+        self.totals = {}  # (stage, stream) -> [seconds, calls]
+        self.skipped = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._profilers = []
+        if cprofile:
+            self.thread_init()
+
+    @contextmanager
+    def stage(self, name, stream=""):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, stream, time.perf_counter() - started)
+
+    def add(self, name, stream, seconds):
+        with self._lock:
+            total = self.totals.setdefault((name, stream), [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+
+    def skip(self, iteration, reason, cameras=()):
+        with self._lock:
+            self.skipped.append({"iteration": iteration, "reason": reason, "cameras": list(cameras)})
+
+    def thread_init(self):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:  # Python 3.12+ allows one active profiler
+            print(f"cProfile not enabled in {threading.current_thread().name}: {e}")
+            return
+        with self._lock:
+            self._profilers.append(profiler)
+
+    def report(self):
+        stages = [
+            {"stage": stage, "stream": stream, "seconds": round(seconds, 4), "calls": calls,
+             "mean_ms": round(seconds / calls * 1e3, 3) if calls else 0.0}
+            for (stage, stream), (seconds, calls) in sorted(self.totals.items())
+        ]
+        return {
+            "log": self.name,
+            "wall_seconds": round(time.perf_counter() - self._started, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "skipped_frames": len(self.skipped),
+            "stages": stages,
+            "skipped": sorted(self.skipped, key=lambda s: s["iteration"]),
+        }
+
+    def write(self, outfolder):
+        """Write <name>.profile.json, <name>.profile.csv and, with cProfile, <name>.prof."""
+        report = self.report()
+        base = os.path.join(outfolder, self.name)
+        with open(base + ".profile.json", "w") as f:
+            json.dump(report, f, indent=2)
+        with open(base + ".profile.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["stage", "stream", "seconds", "calls", "mean_ms"])
+            writer.writeheader()
+            writer.writerows(report["stages"])
+        if self._profilers:
+            for profiler in self._profilers:
+                profiler.disable()
+            stats = pstats.Stats(*self._profilers)
+            stats.dump_stats(base + ".prof")
+        print(f"Profile written to: {base}.profile.json")
+        return report
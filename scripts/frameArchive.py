@@ -0,0 +1,117 @@
+#memory-mapped archive of a log's camera tiles: exact RGB frames with O(1), zero-copy random access
+#layout: header, camera table (name, height, width, offset within a frame record), then from a
+#page-aligned data offset one fixed-size record per frame holding every camera's HxWx3 uint8 tile
+
+import struct
+
+import numpy as np
+
+_MAGIC = b"FARCv1\0\0"
+_HEADER = struct.Struct("<8sqqqq")  # magic, frame count, camera count, record size, data offset
+_CAMERA = struct.Struct("<8sqqq")   # camera name, height, width, offset within a record
+_PAGE = 4096
+_RECORD_ALIGN = 64  # records start on cache-line boundaries
+
+
+class ArchiveLayout:
+    """Where each camera's tile sits inside a frame record, for tile sizes {cam: (width, height)}."""
+
+    def __init__(self, sizes):
+        self.cameras = []  # (cam, height, width, offset)
+        offset = 0
+        for cam, (width, height) in sizes.items():
+            self.cameras.append((cam, height, width, offset))
+            offset += height * width * 3
+        self.record_size = -(-offset // _RECORD_ALIGN) * _RECORD_ALIGN
+        self.data_offset = -(-(_HEADER.size + _CAMERA.size * len(self.cameras)) // _PAGE) * _PAGE
+
+    def views(self, record):
+        """{cam: HxWx3 view} into one record buffer, for filling it in place."""
+        return {
+            cam: record[offset:offset + height * width * 3].reshape(height, width, 3)
+            for cam, height, width, offset in self.cameras
+        }
+
+    def header(self, frame_count):
+        parts = [_HEADER.pack(_MAGIC, frame_count, len(self.cameras), self.record_size, self.data_offset)]
+        parts += [_CAMERA.pack(cam.encode(), height, width, offset) for cam, height, width, offset in self.cameras]
+        return b"".join(parts).ljust(self.data_offset, b"\0")
+
+
+class ArchiveWriter:
+    """Appends frame records (1-D uint8 arrays of layout.record_size) to an archive file.
+
+    Same append_data/close interface as the imageio writers; the frame
+    count in the header is filled in on close.
+    """
+
+    def __init__(self, path, sizes):
+        self.path = path
+        self.layout = ArchiveLayout(sizes)
+        self.frames = 0
+        self._file = open(path, "wb")
+        self._file.write(self.layout.header(0))
+
+    def append_data(self, record):
+        self._file.write(memoryview(record))
+        self.frames += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(self.layout.header(self.frames))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameArchive:
+    """Read side of an archive; tile(cam, index) is a zero-copy view into the memory map.
+
+    Also usable as a labeler stream: it has frame_count and release() like
+    SeekableCapture, and frame(index) returns every camera's tile at once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, count, num_cameras, record_size, data_offset = _HEADER.unpack(self._map[:_HEADER.size].tobytes())
+        if magic != _MAGIC:
+            raise ValueError(f"Not a frame archive: {path}")
+        if len(self._map) < data_offset + count * record_size:
+            raise ValueError(f"Truncated frame archive: {path}")
+        self.frame_count = count
+        self.sizes = {}
+        self._tiles = {}
+        for i in range(num_cameras):
+            start = _HEADER.size + i * _CAMERA.size
+            name, height, width, offset = _CAMERA.unpack(self._map[start:start + _CAMERA.size].tobytes())
+            cam = name.rstrip(b"\0").decode()
+            self.sizes[cam] = (width, height)
+            # (frame, row, col, channel) view of this camera across all records
+            self._tiles[cam] = np.ndarray(
+                (count, height, width, 3), dtype=np.uint8, buffer=self._map,
+                offset=data_offset + offset, strides=(record_size, width * 3, 3, 1),
+            )
+
+    @property
+    def cameras(self):
+        return list(self._tiles)
+
+    def tile(self, cam, index):
+        return self._tiles[cam][index]
+
+    def frame(self, index):
+        """{cam: tile} at `index`, or None past the end."""
+        if not 0 <= index < self.frame_count:
+            return None
+        return {cam: tiles[index] for cam, tiles in self._tiles.items()}
+
+    def release(self):
+        self._tiles = {}
+        self._map = None
@@ -0,0 +1,139 @@
+#LRU cache of decoded, resized RGB tiles for the labelers, and the readers that fill it
+
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from frameArchive import FrameArchive
+from videoSeek import SeekableCapture
+from viewLayout import (ARCHIVE_STREAM, CAMERA_IDS, MOSAIC_LAYOUT, MOSAIC_STREAM, TILE_SIZES, proxy_stream,
+                        video_filename)
+
+
+class FrameCache:
+    """LRU of numpy tiles keyed by (camera, frame index), bounded by total bytes.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.nbytes = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._tiles
+
+    def get(self, key):
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, key, tile):
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._tiles[key] = tile
+            self.nbytes += tile.nbytes
+            while self.nbytes > self.budget_bytes and len(self._tiles) > 1:
+                _, evicted = self._tiles.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+            self.nbytes = 0
+
+
+class TileReader:
+    """Serves display tiles for a log's video streams through a FrameCache.
+
+    A stream is either one camera's video or the composited mosaic, which
+    yields every camera's tile from a single decode. Tiles are converted to
+    RGB and sized for display before caching under (camera, frame index).
+    A frame archive stream needs no decode: its tiles are views into the
+    memory map, cached as-is when already display size.
+    """
+
+    def __init__(self, streams, cache):
+        self.streams = streams
+        self.cache = cache
+        self.cams = {
+            name: list(MOSAIC_LAYOUT) if name == MOSAIC_STREAM
+            else streams[name].cameras if name == ARCHIVE_STREAM else [name]
+            for name in streams
+        }
+
+    def decode(self, stream, index):
+        """{camera: tile} for one stream at frame `index`, or None past the end of the video."""
+        if stream == ARCHIVE_STREAM:
+            tiles = self.streams[stream].frame(index)
+            if tiles is None:
+                return None
+            return {
+                cam: tile if (tile.shape[1], tile.shape[0]) == TILE_SIZES[cam] else cv2.resize(tile, TILE_SIZES[cam])
+                for cam, tile in tiles.items()
+            }
+        frame = self.streams[stream].read_at(index)
+        if frame is None:
+            return None
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if stream == MOSAIC_STREAM:
+            tiles = {}
+            for cam, (x, y) in MOSAIC_LAYOUT.items():
+                w, h = TILE_SIZES[cam]
+                tiles[cam] = np.ascontiguousarray(frame[y:y + h, x:x + w])
+            return tiles
+        size = TILE_SIZES[stream]
+        if (frame.shape[1], frame.shape[0]) != size:  # proxies are already display size
+            frame = cv2.resize(frame, size)
+        return {stream: frame}
+
+    def is_cached(self, stream, index):
+        return all((cam, index) in self.cache for cam in self.cams[stream])
+
+    def load(self, stream, index):
+        """Decode one stream's frame into the cache; returns False past the end of the video."""
+        tiles = self.decode(stream, index)
+        if tiles is None:
+            return False
+        for cam, tile in tiles.items():
+            self.cache.put((cam, index), tile)
+        return True
+
+
+def open_log_streams(video_dir, base_name, use_mosaic=True, use_proxies=True, use_archive=True):
+    """Open a log's frames: the frame archive or the mosaic when present (and wanted), else all eight cameras.
+
+    Each camera uses its display-size proxy when present and `use_proxies`
+    is set, and the full-resolution video otherwise.
+    """
+    archive_path = os.path.join(video_dir, video_filename(base_name, ARCHIVE_STREAM))
+    if use_archive and os.path.exists(archive_path):
+        return {ARCHIVE_STREAM: FrameArchive(archive_path)}
+    mosaic_path = os.path.join(video_dir, video_filename(base_name, MOSAIC_STREAM))
+    if use_mosaic and os.path.exists(mosaic_path):
+        return {MOSAIC_STREAM: SeekableCapture(mosaic_path)}
+    streams = {}
+    try:
+        for cam in CAMERA_IDS:
+            path = os.path.join(video_dir, video_filename(base_name, cam))
+            proxy_path = os.path.join(video_dir, video_filename(base_name, proxy_stream(cam)))
+            if use_proxies and os.path.exists(proxy_path):
+                path = proxy_path
+            elif not os.path.exists(path):
+                raise FileNotFoundError(f"Video file not found: {path}")
+            streams[cam] = SeekableCapture(path)
+    except BaseException:
+        for cap in streams.values():
+            cap.release()
+        raise
+    return streams
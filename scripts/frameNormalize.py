@@ -0,0 +1,107 @@
+#allocation-free conversion of camera images to the writers' HxWx3 uint8 format
+
+import threading
+from functools import partial
+
+import cv2
+import numpy as np
+
+
+class BufferPool:
+    """Recycles fixed-shape, C-contiguous uint8 arrays between loader and encoder threads.
+
+    acquire() reuses a released buffer when one is free and only allocates
+    while the pipeline is filling up, so the pool settles at the number of
+    frames in flight. release() ignores arrays the pool did not hand out.
+    With `zeroed`, new buffers start black; callers that only ever overwrite
+    the same regions can rely on the rest staying black across reuse.
+    """
+
+    def __init__(self, shape, zeroed=False):
+        self.shape = tuple(shape)
+        self.zeroed = zeroed
+        self._free = []
+        self._owned = {}  # id -> buffer; holding a reference keeps ids from being reused
+        self._lock = threading.Lock()
+
+    @property
+    def allocated(self):
+        return len(self._owned)
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+        buf = np.zeros(self.shape, dtype=np.uint8) if self.zeroed else np.empty(self.shape, dtype=np.uint8)
+        with self._lock:
+            self._owned[id(buf)] = buf
+        return buf
+
+    def release(self, buf):
+        with self._lock:
+            if id(buf) in self._owned:
+                self._free.append(buf)
+
+
+class FrameNormalizer:
+    """Converts one camera stream's images to contiguous HxWx3 uint8.
+
+    The conversion is chosen once from the first frame's dtype and shape
+    (and re-chosen only if they change): contiguous uint8 RGB passes through
+    untouched; uint8 RGBA and grayscale go through cv2.cvtColor and anything
+    else through np.copyto, both writing into pooled buffers, so no
+    per-frame arrays are allocated. Converted frames must be handed back
+    with release() once written.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self._state = None  # (signature, convert), swapped as one so loader threads never see half of it
+        self._lock = threading.Lock()
+
+    def __call__(self, img):
+        state = self._state
+        if state is None or state[0] != (img.dtype, img.shape):
+            state = self._select(img)
+        return state[1](img)
+
+    def release(self, buf):
+        if self.pool is not None:
+            self.pool.release(buf)
+
+    def _select(self, img):
+        signature = (img.dtype, img.shape)
+        with self._lock:
+            if self._state is not None and self._state[0] == signature:
+                return self._state  # another loader thread got here first
+            fast = img.dtype == np.uint8 and img.flags.c_contiguous
+            if fast and img.ndim == 3 and img.shape[2] == 3:
+                convert = self._passthrough
+            else:
+                shape = (img.shape[0], img.shape[1], 3)
+                pool = self.pool if self.pool is not None and self.pool.shape == shape else BufferPool(shape)
+                if fast and img.ndim == 2:
+                    convert = partial(self._cvt_color, pool=pool, code=cv2.COLOR_GRAY2RGB)
+                elif fast and img.shape[2] == 4:
+                    convert = partial(self._cvt_color, pool=pool, code=cv2.COLOR_RGBA2RGB)
+                else:
+                    convert = partial(self._gray if img.ndim == 2 else self._first_three, pool=pool)
+                self.pool = pool
+            self._state = (signature, convert)
+            return self._state
+
+    def _passthrough(self, img):
+        return img
+
+    def _cvt_color(self, img, pool, code):
+        return cv2.cvtColor(img, code, dst=pool.acquire())
+
+    def _first_three(self, img, pool):
+        buf = pool.acquire()
+        np.copyto(buf, img[:, :, :3], casting="unsafe")
+        return buf
+
+    def _gray(self, img, pool):
+        buf = pool.acquire()
+        np.copyto(buf, img[:, :, None], casting="unsafe")
+        return buf
@@ -0,0 +1,99 @@
+#background decoding of labeler frames ahead of the playhead
+
+import threading
+import time
+
+
+class FramePrefetcher:
+    """One reader thread per video stream that keeps the frames ahead of the playhead decoded.
+
+    Each thread owns its stream's capture and fills the shared FrameCache
+    with the window [playhead, playhead + lookahead), acting as a ring buffer
+    that slides with playback. The Tk thread only calls seek() and frame(),
+    which never decode, so a slow decode stalls playback instead of the UI.
+    The cache budget should hold at least `lookahead` frames of every camera.
+    """
+
+    def __init__(self, tiles, lookahead=40):
+        self.tiles = tiles
+        self.lookahead = lookahead
+        self._cond = threading.Condition()
+        self._playhead = 0
+        self._stop_index = None      # don't prefetch at or beyond this frame (segment end)
+        self._generation = 0         # bumped on every seek so readers restart their window
+        self._done = {stream: -1 for stream in tiles.streams}         # last generation fully prefetched
+        self._ends = {stream: float("inf") for stream in tiles.streams}  # first frame past the video's end
+        self._stopped = False
+        self._threads = [
+            threading.Thread(target=self._run, args=(stream,), name=f"prefetch-{stream}", daemon=True)
+            for stream in tiles.streams
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def seek(self, index, stop_index=None):
+        """Move the playhead; readers start filling the window from `index`."""
+        with self._cond:
+            self._playhead = index
+            self._stop_index = stop_index
+            self._generation += 1
+            self._cond.notify_all()
+
+    def frame(self, index):
+        """Tiles of every camera at `index` if all are decoded, else None.
+
+        Cameras whose video ended before `index` are left out, so an empty
+        dict means every video has ended.
+        """
+        frames = {}
+        for stream, cams in self.tiles.cams.items():
+            if index >= self._ends[stream]:
+                continue
+            for cam in cams:
+                tile = self.tiles.cache.get((cam, index))
+                if tile is None:
+                    return None
+                frames[cam] = tile
+        return frames
+
+    def wait_frame(self, index, timeout=2.0):
+        """Like frame(), but waits up to `timeout` seconds for the readers (used after seeks)."""
+        deadline = time.monotonic() + timeout
+        frames = self.frame(index)
+        while frames is None and time.monotonic() < deadline:
+            time.sleep(0.005)
+            frames = self.frame(index)
+        return frames
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self, stream):
+        while True:
+            with self._cond:
+                while not self._stopped and self._done[stream] == self._generation:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                generation = self._generation
+                start = self._playhead
+                stop = start + self.lookahead
+                if self._stop_index is not None:
+                    stop = min(stop, self._stop_index)
+
+            for index in range(start, min(stop, self._ends[stream])):
+                if self._stopped or self._generation != generation:
+                    break
+                if self.tiles.is_cached(stream, index):
+                    continue
+                if not self.tiles.load(stream, index):
+                    self._ends[stream] = index
+                    break
+            else:
+                with self._cond:
+                    if self._generation == generation:
+                        self._done[stream] = generation
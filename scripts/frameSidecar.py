@@ -0,0 +1,114 @@
+#per-frame index written next to a log's videos: video frame -> scenario iteration, LiDAR frame and timestamp
+#layout: header (magic, record count, token width) followed by fixed-size little-endian records,
+#one per exported iteration in order; skipped iterations are kept with video_frame = -1
+
+import os
+import struct
+
+import numpy as np
+
+from viewLayout import CAMERA_IDS
+
+SIDECAR_SUFFIX = ".frames.bin"
+
+_MAGIC = b"FRIDXv1\0"
+_HEADER = struct.Struct("<8sqq")  # magic, record count, token width
+
+
+def sidecar_path(outfolder, name):
+    return os.path.join(outfolder, name + SIDECAR_SUFFIX)
+
+
+def record_dtype(token_width):
+    return np.dtype([
+        ("video_frame", "<i4"),      # frame number in the videos, -1 if the iteration was skipped
+        ("iteration", "<i4"),        # scenario iteration
+        ("lidar_index", "<i4"),      # row in the log's lidar_pc table, in timestamp order
+        ("timestamp", "<i8"),        # LiDAR timestamp, microseconds
+        ("skipped_cameras", "<u1"),  # bit i set = CAMERA_IDS[i] had no image
+        ("token", "u1", (token_width,)),
+    ])
+
+
+def camera_mask(cameras):
+    mask = 0
+    for cam in cameras:
+        mask |= 1 << CAMERA_IDS.index(cam)
+    return mask
+
+
+def mask_cameras(mask):
+    return [cam for i, cam in enumerate(CAMERA_IDS) if mask >> i & 1]
+
+
+class SidecarWriter:
+    """Collects one record per exported iteration and writes the sidecar atomically.
+
+    `lidar_indices[iteration]` is the LiDAR frame a scenario iteration reads
+    (see LidarIndex.full_log_indices).
+    """
+
+    def __init__(self, path, index, lidar_indices):
+        self.path = path
+        self.index = index
+        self.lidar_indices = lidar_indices
+        self._rows = []
+        self._frames = 0
+
+    def add(self, iteration, written, skipped_cameras=()):
+        i = self.lidar_indices[iteration]
+        video_frame = self._frames if written else -1
+        self._frames += written
+        self._rows.append((video_frame, iteration, i, self.index.timestamps[i],
+                           camera_mask(skipped_cameras), bytes.fromhex(self.index.token(i))))
+
+    def save(self):
+        width = self.index.token_width
+        records = np.zeros(len(self._rows), dtype=record_dtype(width))
+        for record, (video_frame, iteration, i, timestamp, mask, token) in zip(records, self._rows):
+            record["video_frame"], record["iteration"], record["lidar_index"] = video_frame, iteration, i
+            record["timestamp"], record["skipped_cameras"] = timestamp, mask
+            record["token"] = np.frombuffer(token.ljust(width, b"\0"), dtype=np.uint8)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(records), width))
+            f.write(records.tobytes())
+        os.replace(tmp_path, self.path)
+        print(f"Saved frame index to: {self.path}")
+
+
+class FrameSidecar:
+    """Reads a sidecar; frame(n) resolves video frame n in O(1)."""
+
+    def __init__(self, records):
+        self.records = records
+        self.frames = records[records["video_frame"] >= 0]  # ordered by video frame
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, count, width = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError(f"Not a frame index sidecar: {path}")
+            records = np.fromfile(f, dtype=record_dtype(width), count=count)
+        if len(records) != count:
+            raise ValueError(f"Truncated frame index sidecar: {path}")
+        return cls(records)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def frame(self, n):
+        """{iteration, lidar_index, token, timestamp} of video frame n."""
+        record = self.frames[n]
+        return {
+            "iteration": int(record["iteration"]),
+            "lidar_index": int(record["lidar_index"]),
+            "token": record["token"].tobytes().hex(),
+            "timestamp": int(record["timestamp"]),
+        }
+
+    def skipped(self):
+        """(iteration, skipped cameras) of every iteration left out of the videos."""
+        return [(int(r["iteration"]), mask_cameras(int(r["skipped_cameras"])))
+                for r in self.records[self.records["video_frame"] < 0]]
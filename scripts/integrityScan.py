@@ -0,0 +1,135 @@
+#checks which camera images referenced by each log of a split exist under sensor_blobs, in parallel
+#usage: python integrityScan.py [split dir] --sensor-root <sensor_blobs> --report scan.json --workers 8
+#the report has per-log and per-camera missing counts and gap maps; batchVideoGen --scan-report uses it
+
+import argparse
+import glob
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import logDb
+
+DEFAULT_SPLIT_ROOT = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/nuplan-v1.1/splits/mini"
+DEFAULT_SENSOR_ROOT = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/nuplan-v1.1/sensor_blobs"
+
+
+def list_dir(path, listings):
+    """File names in a directory, listed once per scan with os.scandir (empty if it doesn't exist)."""
+    names = listings.get(path)
+    if names is None:
+        try:
+            with os.scandir(path) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            names = set()
+        listings[path] = names
+    return names
+
+
+def gap_map(timestamps, missing):
+    """[first timestamp, last timestamp, images] of every run of consecutive missing images."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], missing.astype(np.int8), [0]))))
+    return [[int(timestamps[s]), int(timestamps[e - 1]), int(e - s)] for s, e in zip(edges[::2], edges[1::2])]
+
+
+def scan_log(db_path, sensor_root):
+    """Per-camera image counts, missing counts and gap maps for one log.
+
+    All image rows come from one query; each blob directory is listed once
+    and files are checked against the listing instead of stat-ed one by one.
+    """
+    rows = logDb.connect(db_path).execute(
+        """
+        SELECT c.channel, i.timestamp, i.filename_jpg
+        FROM image AS i JOIN camera AS c ON i.camera_token = c.token
+        ORDER BY c.channel, i.timestamp
+        """
+    ).fetchall()
+    by_channel = {}
+    for channel, timestamp, filename in rows:
+        by_channel.setdefault(channel, []).append((timestamp, filename))
+
+    listings = {}
+    cameras = {}
+    for channel, images in by_channel.items():
+        timestamps = np.array([timestamp for timestamp, _ in images], dtype=np.int64)
+        missing = np.array([
+            os.path.basename(filename) not in list_dir(os.path.join(sensor_root, os.path.dirname(filename)), listings)
+            for _, filename in images
+        ], dtype=bool)
+        cameras[channel] = {
+            "images": len(images),
+            "missing": int(missing.sum()),
+            "gaps": gap_map(timestamps, missing),
+        }
+    images = sum(cam["images"] for cam in cameras.values())
+    missing = sum(cam["missing"] for cam in cameras.values())
+    return {
+        "images": images,
+        "missing": missing,
+        "missing_fraction": missing / images if images else 0.0,
+        "cameras": cameras,
+    }
+
+
+def scan_logs(db_paths, sensor_root, workers=8):
+    """scan_log for many logs in parallel. Returns {log name: result}; failures carry an "error" key."""
+    def scan(db_path):
+        try:
+            return scan_log(db_path, sensor_root)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            logDb.close_all()
+
+    db_paths = list(db_paths)
+    names = [os.path.splitext(os.path.basename(p))[0] for p in db_paths]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(names, pool.map(scan, db_paths)))
+
+
+def load_report(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def broken_logs(report, max_missing):
+    """{log name: reason} for logs the scan could not read or that miss more than `max_missing` of their images."""
+    broken = {}
+    for name, result in report["logs"].items():
+        if "error" in result:
+            broken[name] = f"integrity scan failed: {result['error']}"
+        elif result["missing_fraction"] > max_missing:
+            broken[name] = f"{result['missing_fraction']:.1%} of camera images missing"
+    return broken
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that every camera image a split references exists.")
+    parser.add_argument("split_dir", nargs="?", default=DEFAULT_SPLIT_ROOT)
+    parser.add_argument("--sensor-root", default=DEFAULT_SENSOR_ROOT)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--report", default="integrity_scan.json", help="JSON report path")
+    args = parser.parse_args()
+
+    db_paths = sorted(glob.glob(os.path.join(args.split_dir, "*.db")))
+    if not db_paths:
+        raise SystemExit(f"No log DBs found in {args.split_dir}")
+    logs = scan_logs(db_paths, args.sensor_root, args.workers)
+    for name, result in logs.items():
+        if "error" in result:
+            print(f"{name}: ERROR {result['error']}")
+            continue
+        worst = ", ".join(f"{channel} {cam['missing']}" for channel, cam in result["cameras"].items() if cam["missing"])
+        print(f"{name}: {result['missing']}/{result['images']} images missing"
+              f" ({result['missing_fraction']:.1%}){': ' + worst if worst else ''}")
+    with open(args.report, "w") as f:
+        json.dump({"split_dir": args.split_dir, "sensor_root": args.sensor_root, "logs": logs}, f, indent=1)
+    print(f"Report written to: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
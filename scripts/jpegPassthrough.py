@@ -0,0 +1,142 @@
+#camera videos straight from sensor_blobs: compressed JPEG bytes piped to ffmpeg, never decoded in Python
+
+import os
+import subprocess
+import tempfile
+
+import imageio_ffmpeg
+import numpy as np
+
+import logDb
+from encoderSettings import ffmpeg_output_args
+
+MATCH_WINDOW_US = 50000  # a camera image belongs to a LiDAR sweep within +-50 ms, as in nuPlan
+READAHEAD_ITERATIONS = 8  # iterations ahead whose files the OS is asked to start reading
+
+
+def camera_image_files(db_path, lidar_timestamps, channels, window_us=MATCH_WINDOW_US):
+    """filename_jpg of each camera's image nearest each LiDAR timestamp, in one query.
+
+    `channels` maps camera ids to DB channel names (e.g. "F0" -> "CAM_F0").
+    Returns {cam: [filename or None per timestamp]}; None where no image of
+    that camera lies within `window_us` of the sweep.
+    """
+    rows = logDb.connect(db_path).execute(
+        """
+        SELECT c.channel, i.timestamp, i.filename_jpg
+        FROM image AS i JOIN camera AS c ON i.camera_token = c.token
+        ORDER BY c.channel, i.timestamp
+        """
+    ).fetchall()
+    by_channel = {}
+    for channel, timestamp, filename in rows:
+        stamps, names = by_channel.setdefault(channel, ([], []))
+        stamps.append(timestamp)
+        names.append(filename)
+
+    targets = np.asarray(lidar_timestamps, dtype=np.int64)
+    files = {}
+    for cam, channel in channels.items():
+        stamps, names = by_channel.get(channel, ([], []))
+        if not stamps:
+            files[cam] = [None] * len(targets)
+            continue
+        stamps = np.asarray(stamps, dtype=np.int64)
+        pos = np.searchsorted(stamps, targets)
+        before = np.maximum(pos - 1, 0)
+        after = np.minimum(pos, len(stamps) - 1)
+        nearest = np.where(np.abs(stamps[before] - targets) <= np.abs(stamps[after] - targets), before, after)
+        matched = np.abs(stamps[nearest] - targets) <= window_us
+        files[cam] = [names[j] if ok else None for j, ok in zip(nearest.tolist(), matched.tolist())]
+    return files
+
+
+class JpegFiles:
+    """Per-iteration JPEG paths of a log's cameras, read as raw bytes.
+
+    Each file is read with one unbuffered read; hint() asks the OS to start
+    reading the files a few iterations ahead (posix_fadvise WILLNEED) so
+    the loader threads rarely wait on the disk.
+    """
+
+    def __init__(self, sensor_root, files):
+        self.sensor_root = sensor_root
+        self.files = files  # cam -> [relative path or None per iteration]
+
+    def path(self, cam, iteration):
+        name = self.files[cam][iteration] if iteration < len(self.files[cam]) else None
+        return os.path.join(self.sensor_root, name) if name else None
+
+    def read(self, cams, iteration):
+        """({cam: JPEG bytes}, [cams whose image is missing]) for one iteration."""
+        data, missing = {}, []
+        for cam in cams:
+            path = self.path(cam, iteration)
+            if path is None:
+                missing.append(cam)
+                continue
+            try:
+                with open(path, "rb", buffering=0) as f:
+                    data[cam] = f.read()
+            except OSError:
+                missing.append(cam)
+        return data, missing
+
+    def hint(self, cams, iteration):
+        if not hasattr(os, "posix_fadvise"):
+            return
+        for cam in cams:
+            path = self.path(cam, iteration)
+            if path is None:
+                continue
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+
+
+class JpegPipeWriter:
+    """imageio-style writer (append_data/close) that feeds JPEG bytes to ffmpeg's image2pipe demuxer.
+
+    ffmpeg decodes the JPEGs itself and encodes them with the run's encoder
+    settings, so frames never become NumPy arrays in Python. Its stderr goes
+    to a temporary file rather than a pipe, so a flood of decode warnings
+    can't fill the pipe and stall ffmpeg (and with it append_data).
+    """
+
+    def __init__(self, path, fps, encoder, gop=None):
+        self.path = path
+        cmd = [
+            imageio_ffmpeg.get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "image2pipe", "-c:v", "mjpeg", "-framerate", str(fps), "-i", "-",
+            *ffmpeg_output_args(encoder, gop), path,
+        ]
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def append_data(self, jpeg):
+        self.proc.stdin.write(jpeg)
+
+    def close(self):
+        if self.proc.stdin.closed:
+            return
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.proc.wait()
+        self._stderr.seek(0)
+        err = self._stderr.read().decode(errors="replace")
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed writing {self.path}: {err.strip()[-4000:]}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,162 @@
+#per-frame agreement between annotators who labeled the same log, and a merged consensus label track
+#usage: python labelAgreement.py outputs/ agreement/ --min-annotators 2
+#writes <log>.consensus.csv (consensus rows in the labeler CSV format, username "consensus"),
+#<log>.agreement.csv (agreement per frame range) and agreement_summary.csv (one row per log)
+
+import argparse
+import csv
+import os
+from collections import Counter
+
+from labelCsv import LABEL_HEADER, iter_label_files, read_label_rows
+
+CONSENSUS_USER = "consensus"
+CONSENSUS_SUFFIX = ".consensus.csv"  # not <log>.csv, so iter_label_files never mistakes it for an annotator's labels
+UNKNOWN_USER = "(unknown)"  # rows without a username (testLabeler's 4-column schema)
+AGREEMENT_HEADER = ["start_frame", "end_frame", "annotators", "label", "votes", "agreement"]
+SUMMARY_HEADER = ["log", "annotators", "labels", "shared_frames", "mean_agreement",
+                  "consensus_frames", "disputed_frames"]
+
+
+def label_key(label):
+    """Labels compared case- and whitespace-insensitively ("Seg78" == " seg78 ")."""
+    return " ".join(label.split()).casefold()
+
+
+def sweep(rows):
+    """Split the frame axis at every label start/end and yield (start, end, {label: annotators}) per piece.
+
+    `rows` are label dicts as from read_label_rows. Endpoints are sorted
+    once and swept left to right while keeping, per label, how many of each
+    annotator's intervals are open, so the cost grows with the number of
+    labels rather than frames. Pieces nobody labeled are not yielded; an
+    annotator's overlapping intervals with the same label count once.
+    """
+    events = []
+    for row in rows:
+        user = row["username"] or UNKNOWN_USER
+        key = label_key(row["label"])
+        events.append((row["start_frame"], 1, user, key))
+        events.append((row["end_frame"] + 1, -1, user, key))
+    events.sort(key=lambda e: e[0])
+
+    open_labels = {}  # label -> Counter(annotator -> open intervals)
+    i = 0
+    while i < len(events):
+        frame = events[i][0]
+        while i < len(events) and events[i][0] == frame:
+            _, delta, user, key = events[i]
+            users = open_labels.setdefault(key, Counter())
+            users[user] += delta
+            if not users[user]:
+                del users[user]
+                if not users:
+                    del open_labels[key]
+            i += 1
+        if open_labels and i < len(events):
+            yield frame, events[i][0] - 1, {key: set(users) for key, users in open_labels.items()}
+
+
+def agreement_pieces(rows):
+    """Per piece: annotators labeling it, their most common label, its votes and votes / annotators."""
+    rows = list(rows)
+    spelling = {}
+    for row in rows:
+        spelling.setdefault(label_key(row["label"]), row["label"].strip())
+    pieces = []
+    for start, end, labels in sweep(rows):
+        annotators = len(set().union(*labels.values()))
+        votes = Counter({key: len(users) for key, users in labels.items()})
+        (label, top), = votes.most_common(1)
+        if sum(1 for v in votes.values() if v == top) > 1:
+            label = ""  # tie between labels
+        pieces.append({
+            "start_frame": start, "end_frame": end, "annotators": annotators,
+            "label": spelling[label] if label else "", "votes": top, "agreement": round(top / annotators, 4),
+        })
+    return pieces
+
+
+def consensus_track(pieces, min_annotators=2, min_agreement=0.5):
+    """Merged consensus rows (LABEL_HEADER dicts) from agreement pieces.
+
+    A piece takes its top label when at least `min_annotators` labeled it
+    and more than `min_agreement` of them agree; touching pieces with the
+    same consensus label become one row.
+    """
+    track = []
+    for piece in pieces:
+        if not piece["label"] or piece["annotators"] < min_annotators or piece["agreement"] <= min_agreement:
+            continue
+        last = track[-1] if track else None
+        if last and last["label"] == piece["label"] and last["end_frame"] + 1 == piece["start_frame"]:
+            last["end_frame"] = piece["end_frame"]
+            last["_votes"].append((piece["votes"], piece["annotators"]))
+            continue
+        track.append({"start_frame": piece["start_frame"], "end_frame": piece["end_frame"],
+                      "label": piece["label"], "_votes": [(piece["votes"], piece["annotators"])]})
+    for row in track:
+        votes = row.pop("_votes")
+        row["commentary"] = f"at least {min(v for v, _ in votes)} of {max(n for _, n in votes)} annotators agree"
+        row["username"] = CONSENSUS_USER
+    return track
+
+
+def log_summary(log, rows, pieces, consensus, min_annotators=2):
+    """Frame-weighted agreement over the frames at least `min_annotators` annotators labeled."""
+    shared = [p for p in pieces if p["annotators"] >= min_annotators]
+    frames = sum(p["end_frame"] - p["start_frame"] + 1 for p in shared)
+    agreed = sum((p["end_frame"] - p["start_frame"] + 1) * p["agreement"] for p in shared)
+    consensus_frames = sum(r["end_frame"] - r["start_frame"] + 1 for r in consensus)
+    return {
+        "log": log,
+        "annotators": len({r["username"] or UNKNOWN_USER for r in rows}),
+        "labels": len(rows),
+        "shared_frames": frames,
+        "mean_agreement": round(agreed / frames, 4) if frames else "",
+        "consensus_frames": consensus_frames,
+        "disputed_frames": frames - consensus_frames,
+    }
+
+
+def write_rows(path, header, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotator agreement and consensus labels for labeled logs.")
+    parser.add_argument("label_folder", help="folder with the labelers' per-log CSVs")
+    parser.add_argument("out_dir", help="folder for the consensus, agreement and summary CSVs")
+    parser.add_argument("--min-annotators", type=int, default=2,
+                        help="annotators needed on a frame before it gets a consensus label")
+    parser.add_argument("--min-agreement", type=float, default=0.5,
+                        help="fraction of those annotators that must be exceeded by the consensus label")
+    args = parser.parse_args()
+
+    if os.path.realpath(args.out_dir) == os.path.realpath(args.label_folder):
+        raise SystemExit("out_dir must not be the label folder")
+    os.makedirs(args.out_dir, exist_ok=True)
+    summaries = []
+    for log, csv_path in iter_label_files(args.label_folder):
+        rows = list(read_label_rows(csv_path))
+        if not rows:
+            continue
+        pieces = agreement_pieces(rows)
+        consensus = consensus_track(pieces, args.min_annotators, args.min_agreement)
+        write_rows(os.path.join(args.out_dir, f"{log}.agreement.csv"), AGREEMENT_HEADER, pieces)
+        write_rows(os.path.join(args.out_dir, log + CONSENSUS_SUFFIX), LABEL_HEADER, consensus)
+        summary = log_summary(log, rows, pieces, consensus, args.min_annotators)
+        summaries.append(summary)
+        print(f"{log}: {summary['annotators']} annotators, {summary['shared_frames']} shared frames, "
+              f"mean agreement {summary['mean_agreement'] or '-'}, {len(consensus)} consensus labels")
+
+    summary_path = os.path.join(args.out_dir, "agreement_summary.csv")
+    write_rows(summary_path, SUMMARY_HEADER, summaries)
+    print(f"Summary written to: {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
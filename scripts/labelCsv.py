@@ -0,0 +1,44 @@
+#reading the labelers' per-log CSVs (both the 4-column and the 5-column schema)
+
+import csv
+import os
+import re
+
+LABEL_HEADER = ["start_frame", "end_frame", "label", "commentary", "username"]
+LOG_NAME_RE = re.compile(r"^\d{4}\.\d{2}\.\d{2}\.\d{2}\.\d{2}\.\d{2}_veh-\d+_\d+_\d+$")
+
+
+def iter_label_files(folder):
+    """Yield (log name, csv path) for every per-log label CSV in a folder, sorted by name."""
+    for entry in sorted(os.scandir(folder), key=lambda e: e.name):
+        name, ext = os.path.splitext(entry.name)
+        if entry.is_file() and ext == ".csv" and LOG_NAME_RE.match(name):
+            yield name, entry.path
+
+
+def read_label_rows(csv_path):
+    """Stream the label rows of one CSV as dicts with the LABEL_HEADER keys.
+
+    testLabeler writes start,end,label,commentary with no header;
+    userLabeler writes a header and adds username. Files may mix both, so
+    each row is normalized on its own; header rows and rows without integer
+    frame numbers are skipped. Ranges are returned with start <= end.
+    """
+    with open(csv_path, "r", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                start, end = int(row[0]), int(row[1])
+            except ValueError:
+                continue  # header or malformed row
+            if start > end:
+                start, end = end, start
+            row = row + [""] * (len(LABEL_HEADER) - len(row))
+            yield {
+                "start_frame": start,
+                "end_frame": end,
+                "label": row[2],
+                "commentary": row[3],
+                "username": row[4] or None,
+            }
@@ -0,0 +1,109 @@
+#labeling several logs in one session: the next log is opened and warmed while the current one is labeled
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from frameCache import FrameCache, TileReader, open_log_streams
+from framePrefetcher import FramePrefetcher
+from labelCsv import LOG_NAME_RE
+from segmentSampler import CoverageMap, SegmentSampler
+
+# <log><camera>.mp4, <log><camera>_proxy.mp4, <log>_mosaic.mp4 or <log>_archive.bin (see viewLayout.video_filename)
+VIDEO_NAME_RE = re.compile(
+    "^(" + LOG_NAME_RE.pattern[1:-1] + r")(?:(?:_mosaic|[LFRB]\d(?:_proxy)?)\.mp4|_archive\.bin)$"
+)
+
+
+def list_logs(video_dir):
+    """Names of the logs with exported videos (or a frame archive) in `video_dir`, sorted."""
+    logs = set()
+    for entry in os.scandir(video_dir):
+        match = VIDEO_NAME_RE.match(entry.name)
+        if match and entry.is_file():
+            logs.add(match.group(1))
+    return sorted(logs)
+
+
+class LogSession:
+    """One log ready to label: open streams, a running prefetcher and a coverage-aware sampler.
+
+    Construction does all the slow work (opening and probing the captures,
+    reading the saved labels) and points the prefetcher at the first
+    segment, so a session built in the background starts playing from
+    cache. `saved_labels` is the log's existing label dicts and `candidates`
+    its ranked segments from segmentScoring, served before anything else.
+    """
+
+    def __init__(self, video_dir, base_name, saved_labels, min_segment_length,
+                 frame_cache_mb=512, prefetch_frames=40, use_mosaic=True, use_archive=True,
+                 full_resolution=False, candidates=()):
+        self.base_name = base_name
+        self.caps = open_log_streams(
+            video_dir, base_name,
+            use_mosaic=use_mosaic and not full_resolution,
+            use_proxies=not full_resolution,
+            use_archive=use_archive and not full_resolution,
+        )
+        try:
+            self.total_frames = next(iter(self.caps.values())).frame_count
+            self.coverage = CoverageMap.from_rows(self.total_frames, saved_labels)
+            self.sampler = SegmentSampler(self.coverage, min_segment_length, candidates=candidates)
+        except ValueError:
+            self._release_caps()
+            raise
+        self.tiles = TileReader(self.caps, FrameCache(frame_cache_mb * 1024 * 1024))
+        self.prefetcher = FramePrefetcher(self.tiles, lookahead=prefetch_frames)
+        self.first_segment = self.sampler.next_segment()
+        self.prefetcher.seek(*self.first_segment)
+
+    def close(self):
+        self.prefetcher.stop()
+        self._release_caps()
+
+    def _release_caps(self):
+        for cap in self.caps.values():
+            cap.release()
+
+
+class LogQueue:
+    """Hands out LogSessions for a list of logs, preparing the next one in the background.
+
+    `open_session(name)` builds a session; it runs on a worker thread for
+    every log after the first. Logs whose videos are missing, unreadable
+    or too short are reported and skipped.
+    """
+
+    def __init__(self, logs, open_session):
+        self.logs = list(logs)
+        self.position = -1
+        self._open_session = open_session
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-queue")
+        self._next = None  # future for self.logs[self.position + 1]
+
+    def remaining(self):
+        return len(self.logs) - self.position - 1
+
+    def advance(self):
+        """Session for the next usable log, or None when the queue is exhausted."""
+        while self.position + 1 < len(self.logs):
+            self.position += 1
+            name = self.logs[self.position]
+            future, self._next = self._next, None
+            try:
+                session = future.result() if future is not None else self._open_session(name)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            if self.position + 1 < len(self.logs):
+                self._next = self._executor.submit(self._open_session, self.logs[self.position + 1])
+            return session
+        return None
+
+    def close(self):
+        if self._next is not None and not self._next.cancel():
+            try:
+                self._next.result().close()
+            except (OSError, ValueError):
+                pass
+        self._executor.shutdown()
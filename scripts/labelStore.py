@@ -0,0 +1,127 @@
+#optional SQLite (WAL) store for segment labels, safe for several labelers at once
+#usage: python labelStore.py export <store.db> <output folder>   writes one labeler-format CSV per log
+#       python labelStore.py import <store.db> <label folder>    loads existing per-log CSVs into the store
+
+import csv
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from labelCsv import LABEL_HEADER, iter_label_files, read_label_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    id          INTEGER PRIMARY KEY,
+    log         TEXT NOT NULL,
+    start_frame INTEGER NOT NULL,
+    end_frame   INTEGER NOT NULL,
+    label       TEXT,
+    commentary  TEXT,
+    username    TEXT,
+    created_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS labels_log_start ON labels (log, start_frame);
+"""
+
+
+class LabelStore:
+    """Labels in a local SQLite database in WAL mode.
+
+    WAL lets readers and one writer work at the same time and busy_timeout
+    makes concurrent writers wait instead of failing, so several labelers can
+    share one store without torn or lost rows. add() buffers rows and writes
+    them in a single transaction once `batch_size` are pending; flush() and
+    close() write whatever is left. One store may be shared between threads.
+    """
+
+    def __init__(self, db_path, batch_size=1):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # durable across app crashes; WAL keeps it consistent
+        self.conn.execute("PRAGMA busy_timeout=30000")
+        self.conn.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self._pending = []
+
+    def add(self, log, start_frame, end_frame, label, commentary="", username=None):
+        if start_frame > end_frame:
+            start_frame, end_frame = end_frame, start_frame
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with self._lock:
+            self._pending.append((log, start_frame, end_frame, label, commentary, username or None, created_at))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def add_many(self, log, rows):
+        """Insert label dicts (LABEL_HEADER keys) for one log, in one transaction with any pending rows."""
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        rows = [
+            (log, r["start_frame"], r["end_frame"], r["label"], r["commentary"], r["username"], created_at)
+            for r in rows
+        ]
+        with self._lock:
+            self._pending.extend(rows)
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._pending:
+                return
+            with self.conn:  # one transaction, rolled back on error (the rows then stay pending)
+                self.conn.executemany(
+                    "INSERT INTO labels (log, start_frame, end_frame, label, commentary, username, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._pending,
+                )
+            self._pending = []
+
+    def logs(self):
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT log FROM labels ORDER BY log")]
+
+    def labels(self, log):
+        """Label dicts for one log, ordered by start frame."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT start_frame, end_frame, label, commentary, username FROM labels "
+                "WHERE log = ? ORDER BY start_frame, id",
+                (log,),
+            )
+            return [dict(zip(LABEL_HEADER, row)) for row in cursor]
+
+    def export_csv(self, log, csv_path):
+        """Write one log's labels in userLabeler's CSV format (header + 5 columns)."""
+        tmp_path = csv_path + ".tmp"
+        with open(tmp_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(LABEL_HEADER)
+            for row in self.labels(log):
+                writer.writerow([row[key] if row[key] is not None else "" for key in LABEL_HEADER])
+        os.replace(tmp_path, csv_path)
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("export", "import"):
+        raise SystemExit("usage: labelStore.py export|import <store.db> <folder>")
+    command, db_path, folder = sys.argv[1:]
+    store = LabelStore(db_path)
+    if command == "export":
+        os.makedirs(folder, exist_ok=True)
+        for log in store.logs():
+            store.export_csv(log, os.path.join(folder, f"{log}.csv"))
+            print(f"Exported {log}")
+    else:
+        for log, csv_path in iter_label_files(folder):
+            rows = list(read_label_rows(csv_path))
+            store.add_many(log, rows)
+            print(f"Imported {len(rows)} labels for {log}")
+    store.close()
@@ -0,0 +1,215 @@
+#sorted in-memory index of a log's lidar_pc (token, timestamp) table, cached on disk per DB
+
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+
+import logDb
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "doPlan", "lidar_index")
+
+_MAGIC = b"LIDXv1\0\0"
+_HEADER = struct.Struct("<8sqqqq")  # magic, db mtime_ns, db size, frame count, token width
+
+# How autoVideoGen samples a log: NuPlanScenario extraction, then every other iteration
+EXTRACTION_OFFSET = 1         # seconds skipped from the scenario's anchor frame
+SUBSAMPLE_RATIO = 0.5         # scenario keeps every other LiDAR frame
+FIRST_EXPORT_ITERATION = 1    # first scenario iteration written to the videos
+EXPORT_ITERATION_STEP = 2     # videos keep every other scenario iteration
+
+_loaded = {}  # (db path, mtime_ns, size) -> LidarIndex, so repeated loads in one process are free
+
+
+class _SortedTokens:
+    """Read-only sequence of a LidarIndex's tokens in token order, for bisect (no key= before Python 3.10)."""
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return len(self._index._token_order)
+
+    def __getitem__(self, pos):
+        return self._index._token_bytes(self._index._token_order[pos])
+
+
+class LidarIndex:
+    """LiDAR frames of one log sorted by timestamp.
+
+    Timestamps live in an array('q') and tokens in one packed bytes buffer of
+    fixed-width entries; a second array orders frame indices by token. Every
+    lookup is a bisect over these arrays, so nothing touches the DB once the
+    index is built.
+    """
+
+    def __init__(self, timestamps, tokens, token_width, token_order=None):
+        self.timestamps = timestamps
+        self._tokens = tokens
+        self._width = token_width
+        if token_order is None:
+            token_order = array("q", sorted(range(len(timestamps)), key=self._token_bytes))
+        self._token_order = token_order
+
+    @classmethod
+    def from_db(cls, db_path):
+        """Read lidar_pc once, sorted by timestamp."""
+        rows = logDb.connect(db_path).execute("SELECT token, timestamp FROM lidar_pc ORDER BY timestamp ASC").fetchall()
+        width = max((len(token) for token, _ in rows), default=0)
+        timestamps = array("q", (timestamp for _, timestamp in rows))
+        tokens = b"".join(token.ljust(width, b"\0") for token, _ in rows)
+        return cls(timestamps, tokens, width)
+
+    @classmethod
+    def load(cls, db_path, cache_dir=CACHE_DIR):
+        """Return the index for a DB, from memory, the disk cache, or a fresh scan.
+
+        The disk cache is keyed by the DB's absolute path and validated against
+        its mtime and size, so a replaced DB is re-read automatically.
+        """
+        db_path = os.path.abspath(db_path)
+        stat = os.stat(db_path)
+        key = (db_path, stat.st_mtime_ns, stat.st_size)
+        if key in _loaded:
+            return _loaded[key]
+
+        cache_path = None
+        index = None
+        if cache_dir:
+            name = hashlib.sha1(db_path.encode("utf-8")).hexdigest() + ".idx"
+            cache_path = os.path.join(cache_dir, name)
+            index = cls._read_cache(cache_path, stat.st_mtime_ns, stat.st_size)
+        if index is None:
+            index = cls.from_db(db_path)
+            if cache_path:
+                index._write_cache(cache_path, stat.st_mtime_ns, stat.st_size)
+        _loaded[key] = index
+        return index
+
+    @classmethod
+    def _read_cache(cls, cache_path, mtime_ns, size):
+        try:
+            with open(cache_path, "rb") as f:
+                magic, cached_mtime, cached_size, count, width = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC or cached_mtime != mtime_ns or cached_size != size:
+                    return None
+                timestamps = array("q")
+                timestamps.frombytes(f.read(count * timestamps.itemsize))
+                tokens = f.read(count * width)
+                token_order = array("q")
+                token_order.frombytes(f.read(count * token_order.itemsize))
+        except (OSError, struct.error, ValueError):
+            return None
+        if len(timestamps) != count or len(tokens) != count * width or len(token_order) != count:
+            return None
+        if sys.byteorder != "little":
+            timestamps.byteswap()
+            token_order.byteswap()
+        return cls(timestamps, tokens, width, token_order)
+
+    def _write_cache(self, cache_path, mtime_ns, size):
+        timestamps, token_order = array("q", self.timestamps), array("q", self._token_order)
+        if sys.byteorder != "little":
+            timestamps.byteswap()
+            token_order.byteswap()
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, mtime_ns, size, len(self), self._width))
+                f.write(timestamps.tobytes())
+                f.write(self._tokens)
+                f.write(token_order.tobytes())
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not write LiDAR index cache {cache_path}: {e}")
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _token_bytes(self, i):
+        return self._tokens[i * self._width:(i + 1) * self._width]
+
+    def token(self, i):
+        """Hex token of the i-th frame (in timestamp order)."""
+        return self._token_bytes(i).hex()
+
+    @property
+    def token_width(self):
+        return self._width
+
+    @property
+    def first_timestamp(self):
+        return self.timestamps[0]
+
+    @property
+    def last_timestamp(self):
+        return self.timestamps[-1]
+
+    @property
+    def duration_sec(self):
+        return (self.last_timestamp - self.first_timestamp) * 1e-6
+
+    def index_of_token(self, token: str) -> int:
+        """Frame index of a LiDAR token string."""
+        key = bytes.fromhex(token).ljust(self._width, b"\0")
+        pos = bisect_left(_SortedTokens(self), key)
+        if pos == len(self._token_order) or self._token_bytes(self._token_order[pos]) != key:
+            raise ValueError(f"Token {token} not found in DB")
+        return self._token_order[pos]
+
+    def index_at_or_after(self, timestamp: int) -> int:
+        """Index of the first frame with timestamp >= given value."""
+        pos = bisect_left(self.timestamps, timestamp)
+        if pos == len(self.timestamps):
+            raise ValueError(f"No token found at or after timestamp {timestamp}")
+        return pos
+
+    def token_to_timestamp(self, token: str) -> int:
+        """Convert a LiDAR token string to its timestamp (microseconds)."""
+        return self.timestamps[self.index_of_token(token)]
+
+    def timestamp_to_token(self, timestamp: int) -> str:
+        """First token with timestamp >= given value, as a hex string."""
+        return self.token(self.index_at_or_after(timestamp))
+
+    def scenario_indices(self, anchor_timestamp, duration, extraction_offset, subsample_ratio):
+        """Frame indices a NuPlanScenario anchored at `anchor_timestamp` iterates over.
+
+        Mirrors nuPlan's extraction: every 1/subsample_ratio-th frame with a
+        timestamp in [anchor + offset, anchor + offset + duration] (seconds).
+        """
+        start = int(anchor_timestamp + extraction_offset * 1e6)
+        end = int(start + duration * 1e6)
+        step = int(1.0 / subsample_ratio)
+        return range(bisect_left(self.timestamps, start), bisect_right(self.timestamps, end), step)
+
+    def full_log_window(self, extraction_offset=EXTRACTION_OFFSET, subsample_ratio=SUBSAMPLE_RATIO,
+                        probe_duration=509):
+        """(initial token, initial timestamp, duration) of the longest scenario the log supports.
+
+        Gives the same result as building a probe scenario of `probe_duration`
+        seconds from the first frame, reading its first and last time points
+        and rebuilding from the first one, without constructing either.
+        """
+        if not len(self):
+            raise ValueError("No LiDAR frames in log")
+        probe = self.scenario_indices(self.first_timestamp, probe_duration, extraction_offset, subsample_ratio)
+        if not probe:
+            raise ValueError(f"Log is shorter than the {extraction_offset} s extraction offset")
+        first, last = probe[0], probe[-1]
+        duration = (self.timestamps[last] - self.timestamps[first]) * 1e-6 - extraction_offset
+        if duration <= 0:
+            raise ValueError(f"Log too short for a scenario: {duration + extraction_offset:.2f} s usable")
+        return self.token(first), self.timestamps[first], duration
+
+    def full_log_indices(self):
+        """LiDAR frame index of each iteration of autoVideoGen's full-log scenario."""
+        _, initial_timestamp, duration = self.full_log_window()
+        return self.scenario_indices(initial_timestamp, duration, EXTRACTION_OFFSET, SUBSAMPLE_RATIO)
+
+    def video_frame_indices(self):
+        """LiDAR frame index of each exported video frame, assuming no frame was skipped."""
+        return self.full_log_indices()[FIRST_EXPORT_ITERATION::EXPORT_ITERATION_STEP]
@@ -0,0 +1,96 @@
+#shared read-only access to nuPlan log DBs: one tuned connection per (thread, DB)
+#usage: python logDb.py [split dir]   prints frame count/time span of every log in the split
+
+import glob
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+MMAP_SIZE = 256 * 1024 * 1024   # bytes of the DB file SQLite may memory-map
+CACHE_SIZE_KIB = 64 * 1024      # page cache per connection (negative PRAGMA value = KiB)
+
+_local = threading.local()
+
+
+def connect(db_path):
+    """Return this thread's read-only connection to a log DB, opening it on first use.
+
+    Logs are opened with mode=ro&immutable=1, which skips file locking and
+    change detection (the dataset is never written), plus mmap and a larger
+    page cache so repeated metadata queries stay in memory.
+    """
+    db_path = os.path.abspath(db_path)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Log DB not found: {db_path}")
+        conn = sqlite3.connect(f"{Path(db_path).as_uri()}?mode=ro&immutable=1", uri=True)
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+        conn.execute("PRAGMA query_only=1")
+        conns[db_path] = conn
+    return conn
+
+
+def close_all():
+    """Close every connection opened by the calling thread."""
+    for conn in getattr(_local, "conns", {}).values():
+        conn.close()
+    _local.conns = {}
+
+
+def log_metadata(db_path):
+    """Frame count, first/last timestamp and first token of a log in one round trip.
+
+    Returns a dict with keys num_frames, start_ts, end_ts, first_token (hex)
+    and duration_sec.
+    """
+    row = connect(db_path).execute(
+        """
+        SELECT COUNT(*), MIN(timestamp), MAX(timestamp),
+               (SELECT token FROM lidar_pc ORDER BY timestamp ASC LIMIT 1)
+        FROM lidar_pc
+        """
+    ).fetchone()
+    num_frames, start_ts, end_ts, first_token = row
+    if not num_frames:
+        raise ValueError(f"No LiDAR frames found in DB {db_path}")
+    return {
+        "num_frames": num_frames,
+        "start_ts": start_ts,
+        "end_ts": end_ts,
+        "first_token": first_token.hex(),
+        "duration_sec": (end_ts - start_ts) * 1e-6,
+    }
+
+
+def scan_split(db_paths, workers=8):
+    """log_metadata for many logs, fetched in parallel. Returns {db_path: metadata or exception}."""
+    def scan(db_path):
+        try:
+            return log_metadata(db_path)
+        except Exception as e:
+            return e
+        finally:
+            close_all()
+
+    db_paths = list(db_paths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(db_paths, pool.map(scan, db_paths)))
+
+
+if __name__ == "__main__":
+    split_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    results = scan_split(sorted(glob.glob(os.path.join(split_dir, "*.db"))))
+    for db_path, meta in results.items():
+        name = os.path.splitext(os.path.basename(db_path))[0]
+        if isinstance(meta, Exception):
+            print(f"{name}: ERROR {meta}")
+        else:
+            print(f"{name}: {meta['num_frames']} frames, {meta['duration_sec']:.2f} s, first token {meta['first_token']}")
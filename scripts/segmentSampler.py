@@ -0,0 +1,134 @@
+#coverage-aware segment sampling: serve the least-labeled frame ranges of a log first
+#usage: python segmentSampler.py <label folder> <video dir>   prints per-log coverage stats
+
+import os
+import random
+import sys
+
+import numpy as np
+
+from labelCsv import iter_label_files, read_label_rows
+from videoSeek import SeekableCapture
+from viewLayout import CAMERA_IDS, MOSAIC_STREAM, proxy_stream, video_filename
+
+
+class CoverageMap:
+    """How many labels cover each frame of one log, as a per-frame count array.
+
+    Built in one pass from difference counts (+1 at a label's start, -1 after
+    its end); add() bumps a single range as labels are saved.
+    """
+
+    def __init__(self, total_frames, ranges=()):
+        self.total_frames = total_frames
+        self.labels = 0
+        diff = np.zeros(total_frames + 1, dtype=np.int32)
+        for start, end in ranges:
+            start, end = self._clip(start, end)
+            if start <= end:
+                diff[start] += 1
+                diff[end + 1] -= 1
+                self.labels += 1
+        self.counts = np.cumsum(diff[:-1], dtype=np.int32)
+
+    @classmethod
+    def from_rows(cls, total_frames, rows):
+        """From label dicts (labelCsv.read_label_rows or LabelStore.labels)."""
+        return cls(total_frames, ((r["start_frame"], r["end_frame"]) for r in rows))
+
+    def _clip(self, start, end):
+        return max(0, start), min(self.total_frames - 1, end)
+
+    def add(self, start, end):
+        start, end = self._clip(min(start, end), max(start, end))
+        if start <= end:
+            self.counts[start:end + 1] += 1
+            self.labels += 1
+
+    def runs_at_most(self, depth):
+        """(start, end) inclusive runs of frames covered by at most `depth` labels."""
+        mask = np.concatenate(([False], self.counts <= depth, [False]))
+        edges = np.flatnonzero(mask[1:] != mask[:-1])
+        return list(zip(edges[::2].tolist(), (edges[1::2] - 1).tolist()))
+
+    def stats(self):
+        covered = int(np.count_nonzero(self.counts))
+        return {
+            "frames": self.total_frames,
+            "labels": self.labels,
+            "covered_frames": covered,
+            "coverage": covered / self.total_frames if self.total_frames else 0.0,
+            "mean_depth": float(self.counts.mean()) if self.total_frames else 0.0,
+            "min_depth": int(self.counts.min()) if self.total_frames else 0,
+        }
+
+
+class SegmentSampler:
+    """Draws labeling segments from the least-covered ranges of a log.
+
+    Candidate ranges are the runs of frames at the log's current minimum
+    coverage (unlabeled frames while any remain). A run is picked with
+    probability proportional to its length and a segment of at least
+    `min_length` frames is drawn inside it; runs shorter than that get a
+    `min_length` window centred on them.
+
+    Ranked `candidates` (start, end) from segmentScoring are served first,
+    best first, skipping any whose frames are mostly above the minimum
+    coverage already.
+    """
+
+    def __init__(self, coverage, min_length, rng=None, candidates=()):
+        if coverage.total_frames < min_length:
+            raise ValueError(f"Log has {coverage.total_frames} frames, fewer than min_length={min_length}")
+        self.coverage = coverage
+        self.min_length = min_length
+        self.rng = rng or random.Random()
+        self.candidates = [(s, e) for s, e in candidates if 0 <= s <= e < coverage.total_frames][::-1]
+
+    def next_segment(self):
+        """Return (start, end) frame numbers for the next segment to label."""
+        counts = self.coverage.counts
+        while self.candidates:
+            start, end = self.candidates.pop()
+            if np.mean(counts[start:end + 1] <= counts.min()) >= 0.5:
+                return start, end
+        total = self.coverage.total_frames
+        runs = self.coverage.runs_at_most(int(self.coverage.counts.min()))
+        lengths = [end - start + 1 for start, end in runs]
+        run_start, run_end = self.rng.choices(runs, weights=lengths)[0]
+        if run_end - run_start + 1 < self.min_length:
+            centre = (run_start + run_end) // 2
+            start = max(0, min(total - self.min_length, centre - self.min_length // 2))
+            return start, start + self.min_length - 1
+        start = self.rng.randint(run_start, run_end - self.min_length + 1)
+        end = self.rng.randint(start + self.min_length - 1, run_end)
+        return start, end
+
+
+def log_frame_count(video_dir, base_name):
+    """Frame count of a log's exported videos (mosaic, else the first camera's proxy or full-size video), or None."""
+    for stream in (MOSAIC_STREAM, proxy_stream(CAMERA_IDS[0]), CAMERA_IDS[0]):
+        path = os.path.join(video_dir, video_filename(base_name, stream))
+        if os.path.exists(path):
+            cap = SeekableCapture(path)
+            cap.release()
+            return cap.frame_count
+    return None
+
+
+def print_coverage(name, stats):
+    print(f"{name}: {stats['covered_frames']}/{stats['frames']} frames labeled "
+          f"({stats['coverage']:.1%}), {stats['labels']} labels, "
+          f"mean depth {stats['mean_depth']:.2f}, min depth {stats['min_depth']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        raise SystemExit("usage: segmentSampler.py <label folder> <video dir>")
+    label_folder, video_dir = sys.argv[1:]
+    for log, csv_path in iter_label_files(label_folder):
+        total_frames = log_frame_count(video_dir, log)
+        if total_frames is None:
+            print(f"{log}: no videos found, skipped")
+            continue
+        print_coverage(log, CoverageMap.from_rows(total_frames, read_label_rows(csv_path)).stats())
@@ -0,0 +1,172 @@
+#offline scoring of a log's video frames for eventful driving: speed changes, turning, stop/go and nearby agents
+#usage: python segmentScoring.py <log.db | split dir> ... --out <candidates dir> [--video-dir <videos>] --window 150
+#writes <log>.candidates.csv: non-overlapping frame windows ranked by score, which userLabeler serves first
+
+import argparse
+import csv
+import glob
+import os
+
+import numpy as np
+
+import logDb
+from frameSidecar import FrameSidecar, sidecar_path
+from lidarIndex import LidarIndex
+
+CANDIDATES_SUFFIX = ".candidates.csv"
+CANDIDATE_HEADER = ["rank", "start_frame", "end_frame", "score",
+                    "accel", "yaw_rate", "stop_go", "agents", "stationary"]
+
+STOP_SPEED = 0.3      # m/s below which the ego counts as stopped
+AGENT_RADIUS = 30.0   # m around the ego in which boxes count as nearby agents
+WEIGHTS = {"accel": 1.0, "yaw_rate": 1.0, "stop_go": 1.0, "agents": 0.5}
+STATIONARY_PENALTY = 1.0  # subtracted per fraction of the window spent stopped without a stop/go
+
+
+def lidar_features(db_path, agent_radius=AGENT_RADIUS):
+    """Per LiDAR frame (timestamp order, as in LidarIndex): timestamp, ego speed, yaw rate and nearby agents.
+
+    One query joins lidar_pc to ego_pose and counts lidar_box rows within
+    `agent_radius` of the ego in SQL; the rest is done on the arrays. The
+    join keeps every lidar_pc row so positions line up with LidarIndex;
+    frames without an ego pose get NaN speed and yaw rate.
+    """
+    rows = logDb.connect(db_path).execute(
+        """
+        SELECT lp.timestamp, ep.vx, ep.vy, ep.angular_rate_z,
+               (SELECT COUNT(*) FROM lidar_box AS lb
+                WHERE lb.lidar_pc_token = lp.token
+                  AND (lb.x - ep.x) * (lb.x - ep.x) + (lb.y - ep.y) * (lb.y - ep.y) < ?)
+        FROM lidar_pc AS lp LEFT JOIN ego_pose AS ep ON lp.ego_pose_token = ep.token
+        ORDER BY lp.timestamp ASC
+        """,
+        (agent_radius * agent_radius,),
+    ).fetchall()
+    data = np.array(rows, dtype=np.float64).reshape(-1, 5)
+    missing = int(np.isnan(data[:, 1]).sum())
+    if missing:
+        print(f"{os.path.basename(db_path)}: {missing} LiDAR frames without an ego pose")
+    return {
+        "timestamp": data[:, 0],
+        "speed": np.hypot(data[:, 1], data[:, 2]),
+        "yaw_rate": np.abs(data[:, 3]),
+        "agents": data[:, 4],
+    }
+
+
+def video_lidar_indices(db_path, video_dir=None):
+    """LiDAR frame of each video frame: from the export's sidecar if present, else LidarIndex's sampling."""
+    name = os.path.splitext(os.path.basename(db_path))[0]
+    if video_dir and os.path.exists(sidecar_path(video_dir, name)):
+        return FrameSidecar.load(sidecar_path(video_dir, name)).frames["lidar_index"].astype(np.int64)
+    return np.asarray(LidarIndex.load(db_path).video_frame_indices(), dtype=np.int64)
+
+
+def frame_signals(features, indices):
+    """Per video frame: |acceleration|, |yaw rate|, stop/go transitions, agents and stopped flag."""
+    t = features["timestamp"][indices] * 1e-6
+    speed = features["speed"][indices]
+    stopped = speed < STOP_SPEED
+    accel = np.abs(np.gradient(speed, t)) if len(t) > 1 else np.zeros_like(speed)
+    return {
+        "accel": accel,
+        "yaw_rate": features["yaw_rate"][indices],
+        "stop_go": np.concatenate(([0.0], np.abs(np.diff(stopped.astype(np.float64))))),
+        "agents": features["agents"][indices],
+        "stationary": stopped.astype(np.float64),
+    }
+
+
+def window_scores(signals, window, stride):
+    """(starts, {signal: window mean}, score) for windows of `window` frames every `stride` frames.
+
+    Window means come from cumulative sums, with frames missing data
+    counted as zero. Each feature is scaled by its 95th percentile over the
+    log's windows, so the score ranks windows within a log; time spent
+    stopped with no stop/go counts against it.
+    """
+    n = len(signals["accel"])
+    starts = np.arange(0, n - window + 1, stride)
+    means = {}
+    for name, values in signals.items():
+        cumsum = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+        means[name] = (cumsum[starts + window] - cumsum[starts]) / window
+    score = np.zeros(len(starts))
+    for name, weight in WEIGHTS.items():
+        scale = np.percentile(means[name], 95) if len(starts) else 0.0
+        if scale > 0:
+            score += weight * np.minimum(means[name] / scale, 1.5)
+    score -= STATIONARY_PENALTY * means["stationary"] * (means["stop_go"] == 0)
+    return starts, means, score
+
+
+def rank_segments(starts, means, score, window, top=None):
+    """Best-first non-overlapping windows as candidate dicts (end_frame inclusive)."""
+    taken = []
+    candidates = []
+    for i in np.argsort(-score, kind="stable"):
+        start = int(starts[i])
+        if any(start < s + window and s < start + window for s in taken):
+            continue
+        taken.append(start)
+        candidates.append({
+            "rank": len(candidates) + 1, "start_frame": start, "end_frame": start + window - 1,
+            "score": round(float(score[i]), 4),
+            **{name: round(float(means[name][i]), 4) for name in CANDIDATE_HEADER[4:]},
+        })
+        if top and len(candidates) >= top:
+            break
+    return candidates
+
+
+def score_log(db_path, window, stride=None, video_dir=None, top=None):
+    indices = video_lidar_indices(db_path, video_dir)
+    signals = frame_signals(lidar_features(db_path), indices)
+    starts, means, score = window_scores(signals, window, stride or max(1, window // 2))
+    return rank_segments(starts, means, score, window, top)
+
+
+def write_candidates(path, candidates):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CANDIDATE_HEADER)
+        writer.writeheader()
+        writer.writerows(candidates)
+
+
+def read_candidates(path):
+    """(start_frame, end_frame) of a log's candidates in rank order; empty if there is no file."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", newline="") as f:
+        rows = sorted(csv.DictReader(f), key=lambda r: int(r["rank"]))
+    return [(int(r["start_frame"]), int(r["end_frame"])) for r in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank eventful frame windows of nuPlan logs for labeling.")
+    parser.add_argument("inputs", nargs="+", help="log DBs or folders of log DBs")
+    parser.add_argument("--out", required=True, help="folder for the <log>.candidates.csv files")
+    parser.add_argument("--video-dir", default=None, help="exported videos, to use their frame index sidecars")
+    parser.add_argument("--window", type=int, default=150, help="candidate length in video frames")
+    parser.add_argument("--stride", type=int, default=None, help="window step (default: half a window)")
+    parser.add_argument("--top", type=int, default=None, help="keep only the best N candidates per log")
+    args = parser.parse_args()
+
+    db_paths = []
+    for item in args.inputs:
+        db_paths += sorted(glob.glob(os.path.join(item, "*.db"))) if os.path.isdir(item) else [item]
+    os.makedirs(args.out, exist_ok=True)
+    for db_path in db_paths:
+        name = os.path.splitext(os.path.basename(db_path))[0]
+        try:
+            candidates = score_log(db_path, args.window, args.stride, args.video_dir, args.top)
+        except Exception as e:
+            print(f"{name}: ERROR {e}")
+            continue
+        write_candidates(os.path.join(args.out, name + CANDIDATES_SUFFIX), candidates)
+        best = f", best score {candidates[0]['score']}" if candidates else ""
+        print(f"{name}: {len(candidates)} candidates{best}")
+
+
+if __name__ == "__main__":
+    main()
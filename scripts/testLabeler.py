@@ -2,28 +2,41 @@
 
 import tkinter as tk
 import csv
-import cv2
 from PIL import Image, ImageTk
 import os
 
+from frameCache import FrameCache, TileReader, open_log_streams
+from framePrefetcher import FramePrefetcher
+from labelStore import LabelStore
+
 # ---------------- VIDEO SETUP ----------------
 video_dir = "/media/cvrr/0A6AF7D76AF7BE0F/CompetitionData/dataset/videos"
 base_name = "2021.05.12.22.28.35_veh-35_00620_01164"
-
-camera_ids = ["L0", "L1", "L2", "F0", "B0", "R0", "R1", "R2"]
-
-caps = {}
-for cam in camera_ids:
-    path = os.path.join(video_dir, f"{base_name}{cam}.mp4")
-    caps[cam] = cv2.VideoCapture(path)
+frame_cache_mb = 512  # memory budget for decoded tiles
+prefetch_frames = 40  # frames decoded ahead of the playhead
+use_mosaic = True     # play <base_name>_mosaic.mp4 instead of eight videos when it exists
+full_resolution = False  # decode the full-size camera videos instead of the proxies/mosaic
+use_archive = True    # read exact tiles from <base_name>_archive.bin instead of decoding videos when it exists
+
+caps = open_log_streams(
+    video_dir, base_name,
+    use_mosaic=use_mosaic and not full_resolution,
+    use_proxies=not full_resolution,
+    use_archive=use_archive and not full_resolution,
+)
 
 paused = False
+playhead = 0  # frame index currently on screen
 frame_images = {}
+tiles = TileReader(caps, FrameCache(frame_cache_mb * 1024 * 1024))
+prefetcher = FramePrefetcher(tiles, lookahead=prefetch_frames)
 
 # ---------------- CSV SETUP ----------------
 output_folder = "/home/cvrr/Desktop/VLM Competition/doPlan/outputs"
 os.makedirs(output_folder, exist_ok=True)
 csv_path = os.path.join(output_folder, base_name + ".csv")
+label_store = ""  # SQLite label store path; empty = append to csv_path
+store = LabelStore(label_store) if label_store else None
 
 # ---------------- TKINTER ----------------
 root = tk.Tk()
@@ -38,28 +51,30 @@ frame_label_var = tk.StringVar(value="Frame: 0")
 
 # ---------------- FUNCTIONS ----------------
 def current_frame():
-    return int(caps["F0"].get(cv2.CAP_PROP_POS_FRAMES))
+    return playhead
 
 
-def redraw_current_frames():
-    for cam, cap in caps.items():
-        ret, frame = cap.read()
-        if not ret:
-            continue
-
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        size = (640, 360) if cam == "F0" else (320, 180)
-        frame = cv2.resize(frame, size)
+def redraw_current_frames(wait=False):
+    """Blit the playhead's tiles if the prefetcher has them.
 
+    Returns False while they are not decoded yet or once past the end of the videos.
+    """
+    frames = prefetcher.wait_frame(playhead) if wait else prefetcher.frame(playhead)
+    if not frames:
+        return False
+    for cam, frame in frames.items():
         img = ImageTk.PhotoImage(Image.fromarray(frame))
         frame_images[cam] = img
         video_labels[cam].config(image=img)
         video_labels[cam].image = img
+    return True
 
 
 def update_frames():
-    if not paused:
-        redraw_current_frames()
+    global playhead
+    if not paused and redraw_current_frames():
+        playhead += 1
+        prefetcher.seek(playhead)
 
     frame_label_var.set(f"Frame: {current_frame()}")
     root.after(30, update_frames)
@@ -72,19 +87,10 @@ def toggle_pause():
 
 
 def jump_frames(offset):
-    target = current_frame() + offset
-
-    if offset > 0:
-        target -= 1  # adjust for read() advancing the frame
-    elif offset < 0:
-        target -= 1  # adjust for read() advancing the frame backward
-
-    target = max(0, target)
-
-    for cap in caps.values():
-        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
-
-    redraw_current_frames()
+    global playhead
+    playhead = max(0, current_frame() + offset)
+    prefetcher.seek(playhead)
+    redraw_current_frames(wait=True)
 
 
 
@@ -107,15 +113,21 @@ def save_range_label():
     if start > end:
         start, end = end, start
 
-    with open(csv_path, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([start, end, label, commentary])
+    if store is not None:
+        store.add(base_name, start, end, label, commentary)
+    else:
+        with open(csv_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([start, end, label, commentary])
 
     entry.delete(0, tk.END)
     commentary_entry.delete(0, tk.END)
 
 
 def quit_program():
+    prefetcher.stop()
+    if store is not None:
+        store.close()
     for cap in caps.values():
         cap.release()
     root.destroy()
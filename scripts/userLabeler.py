@@ -2,10 +2,14 @@
 
 import tkinter as tk
 import csv
-import cv2
 from PIL import Image, ImageTk
 import os
-import random
+
+from labelCsv import LABEL_HEADER, read_label_rows
+from labelQueue import LogQueue, LogSession, list_logs
+from labelStore import LabelStore
+from segmentSampler import print_coverage
+from segmentScoring import CANDIDATES_SUFFIX, read_candidates
 
 # ---------------- SETTINGS ----------------
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -18,7 +22,15 @@ if not os.path.exists(SETTINGS_FILE):
 video_dir = ""
 base_name = ""
 min_segment_length = 150
+frame_cache_mb = 512  # memory budget for decoded tiles
+prefetch_frames = 40  # frames decoded ahead of the playhead
+use_mosaic = True     # play <base_name>_mosaic.mp4 instead of eight videos when it exists
+full_resolution = False  # decode the full-size camera videos instead of the proxies/mosaic
+use_archive = True    # read exact tiles from <base_name>_archive.bin instead of decoding videos when it exists
 output_folder = os.path.join(SCRIPT_DIR, "outputs")  # default if not in settings
+label_store = ""  # SQLite label store path; empty = append to <output_folder>/<base_name>.csv
+log_queue = ""  # "all" = every log in video_dir, or comma-separated log names; empty = just base_name
+candidates_dir = ""  # folder of segmentScoring's <log>.candidates.csv, served before random segments
 
 # Load settings
 with open(SETTINGS_FILE, "r") as f:
@@ -37,34 +49,83 @@ with open(SETTINGS_FILE, "r") as f:
             min_segment_length = int(value)
         elif key == "output_folder":
             output_folder = value
+        elif key == "frame_cache_mb":
+            frame_cache_mb = int(value)
+        elif key == "prefetch_frames":
+            prefetch_frames = int(value)
+        elif key == "use_mosaic":
+            use_mosaic = value.lower() in ("1", "true", "yes")
+        elif key == "full_resolution":
+            full_resolution = value.lower() in ("1", "true", "yes")
+        elif key == "use_archive":
+            use_archive = value.lower() in ("1", "true", "yes")
+        elif key == "label_store":
+            label_store = value
+        elif key == "log_queue":
+            log_queue = value
+        elif key == "candidates_dir":
+            candidates_dir = value
 
-if not video_dir or not base_name:
-    raise ValueError("video_dir and base_name must be set in settings.txt")
+if not video_dir or not (base_name or log_queue):
+    raise ValueError("video_dir and base_name (or log_queue) must be set in settings.txt")
 
-# ---------------- VIDEO SETUP ----------------
-camera_ids = ["L0", "L1", "L2", "F0", "B0", "R0", "R1", "R2"]
-caps = {}
-for cam in camera_ids:
-    path = os.path.join(video_dir, f"{base_name}{cam}.mp4")
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"Video file not found: {path}")
-    caps[cam] = cv2.VideoCapture(path)
+# ---------------- OUTPUT ----------------
+os.makedirs(output_folder, exist_ok=True)
+# With a label store, saves are transactional inserts (export CSVs with labelStore.py export)
+store = LabelStore(label_store) if label_store else None
 
-paused = False
-frame_images = {}
+def csv_path_for(name):
+    return os.path.join(output_folder, name + ".csv")
 
-ref_cap = caps["F0"]
-total_frames = int(ref_cap.get(cv2.CAP_PROP_FRAME_COUNT))
-if total_frames < min_segment_length:
-    raise RuntimeError(f"Video too short for minimum segment length of {min_segment_length} frames.")
+def saved_labels(name):
+    if store is not None:
+        return store.labels(name)
+    path = csv_path_for(name)
+    return list(read_label_rows(path)) if os.path.exists(path) else []
 
-# ---------------- OUTPUT ----------------
-os.makedirs(output_folder, exist_ok=True)
-csv_path = os.path.join(output_folder, base_name + ".csv")
+# ---------------- LOG QUEUE ----------------
+# Each log is a LogSession: its frame archive, mosaic or eight camera videos (display-size proxies
+# unless full resolution is requested), a prefetcher and a coverage-aware segment
+# sampler. The next log's session is opened and warmed in the background.
+if log_queue.lower() == "all":
+    logs = list_logs(video_dir)
+elif log_queue:
+    logs = [name.strip() for name in log_queue.split(",") if name.strip()]
+else:
+    logs = [base_name]
+
+def open_session(name):
+    return LogSession(
+        video_dir, name, saved_labels(name), min_segment_length,
+        frame_cache_mb=frame_cache_mb, prefetch_frames=prefetch_frames,
+        use_mosaic=use_mosaic, use_archive=use_archive, full_resolution=full_resolution,
+        candidates=read_candidates(os.path.join(candidates_dir, name + CANDIDATES_SUFFIX)) if candidates_dir else (),
+    )
+
+def start_session(new_session):
+    global session, base_name, prefetcher, coverage, sampler, csv_path, csv_needs_header
+    session = new_session
+    base_name = session.base_name
+    prefetcher = session.prefetcher
+    coverage, sampler = session.coverage, session.sampler
+    csv_path = csv_path_for(base_name)
+    # the header check is done once per log instead of on every save
+    csv_needs_header = store is None and (not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0)
+    print_coverage(base_name, coverage.stats())
+
+queue = LogQueue(logs, open_session)
+first_session = queue.advance()
+if first_session is None:
+    raise RuntimeError("None of the queued logs could be opened.")
+start_session(first_session)
+
+paused = False
+playhead = 0  # frame index currently on screen
+frame_images = {}
 
 # ---------------- TKINTER ----------------
 root = tk.Tk()
-root.title("Multi-View Random Segment Labeler")
+root.title(f"Multi-View Random Segment Labeler - {base_name}")
 root.geometry("1150x950")
 
 # ---------------- VARIABLES ----------------
@@ -76,26 +137,34 @@ jump_var = tk.IntVar(value=100)
 
 # ---------------- FUNCTIONS ----------------
 def current_frame():
-    return int(caps["F0"].get(cv2.CAP_PROP_POS_FRAMES))
+    return playhead
 
-def redraw_current_frames():
-    for cam, cap in caps.items():
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        size = (640, 360) if cam == "F0" else (320, 180)
-        frame = cv2.resize(frame, size)
+def redraw_current_frames(wait=False):
+    """Blit the playhead's tiles if the prefetcher has them; returns False if not ready."""
+    frames = prefetcher.wait_frame(playhead) if wait else prefetcher.frame(playhead)
+    if frames is None:
+        return False
+    for cam, frame in frames.items():
         img = ImageTk.PhotoImage(Image.fromarray(frame))
         frame_images[cam] = img
         video_labels[cam].config(image=img)
         video_labels[cam].image = img
+    return True
+
+def seek(index):
+    global playhead
+    playhead = index
+    prefetcher.seek(playhead, segment_end.get())
+    redraw_current_frames(wait=True)
 
 def update_frames():
-    if not paused:
-        redraw_current_frames()
-        if current_frame() >= segment_end.get():
+    global playhead
+    if not paused and redraw_current_frames():
+        if playhead + 1 >= segment_end.get():
             toggle_pause()
+        else:
+            playhead += 1
+            prefetcher.seek(playhead, segment_end.get())
     frame_label_var.set(f"Frame: {current_frame()} (Segment: {segment_start.get()}-{segment_end.get()})")
     root.after(30, update_frames)
 
@@ -103,26 +172,17 @@ def toggle_pause():
     global paused
     paused = not paused
     pause_button.config(text="Play" if paused else "Pause")
-    if paused and current_frame() > segment_end.get():
+    if not paused and current_frame() + 1 >= segment_end.get():
         set_segment_start_frame()
 
 def jump_frames(offset):
-    target = current_frame() + offset
-    if offset != 0:
-        target -= 1
-    target = max(segment_start.get(), min(segment_end.get(), target))
-    for cap in caps.values():
-        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
-    redraw_current_frames()
+    seek(max(segment_start.get(), min(segment_end.get() - 1, current_frame() + offset)))
 
 def set_segment_start_frame():
-    for cap in caps.values():
-        cap.set(cv2.CAP_PROP_POS_FRAMES, segment_start.get())
-    redraw_current_frames()
+    seek(segment_start.get())
 
-def random_segment():
-    start = random.randint(0, total_frames - min_segment_length)
-    end = random.randint(start + min_segment_length, total_frames - 1)
+def next_segment(segment=None):
+    start, end = segment or sampler.next_segment()
     segment_start.set(start)
     segment_end.set(end)
     set_segment_start_frame()
@@ -142,19 +202,37 @@ def save_segment_label():
     username = username_var.get()
     start = segment_start.get()
     end = segment_end.get()
-    file_exists = os.path.exists(csv_path)
-    file_empty = (not file_exists) or (os.path.getsize(csv_path) == 0)
-    with open(csv_path, "a", newline="") as f:
-        writer = csv.writer(f)
-        if file_empty:
-            writer.writerow(["start_frame", "end_frame", "label", "commentary", "username"])
-        writer.writerow([start, end, label, commentary, username])
+    if store is not None:
+        store.add(base_name, start, end, label, commentary, username)
+    else:
+        global csv_needs_header
+        with open(csv_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if csv_needs_header:
+                writer.writerow(LABEL_HEADER)
+                csv_needs_header = False
+            writer.writerow([start, end, label, commentary, username])
+    coverage.add(start, end)
+    print_coverage(base_name, coverage.stats())
     entry.delete(0, tk.END)
     commentary_entry.delete(0, tk.END)
 
+def next_log():
+    new_session = queue.advance()
+    if new_session is None:
+        print("No more logs in the queue.")
+        return
+    old_session = session
+    start_session(new_session)
+    old_session.close()
+    root.title(f"Multi-View Random Segment Labeler - {base_name}")
+    next_segment(session.first_segment)
+
 def quit_program():
-    for cap in caps.values():
-        cap.release()
+    session.close()
+    queue.close()
+    if store is not None:
+        store.close()
     root.destroy()
 
 # ---------------- GUI LAYOUT ----------------
@@ -203,11 +281,12 @@ tk.Button(controls, text=">>", command=lambda: jump_frames(jump_var.get())).pack
 pause_button = tk.Button(controls, text="Pause", command=toggle_pause)
 pause_button.pack(side=tk.LEFT, padx=5)
 tk.Button(controls, text="Replay Segment", command=replay_segment).pack(side=tk.LEFT, padx=5)
-tk.Button(controls, text="Next Segment", command=random_segment).pack(side=tk.LEFT, padx=5)
+tk.Button(controls, text="Next Segment", command=next_segment).pack(side=tk.LEFT, padx=5)
 tk.Button(controls, text="Save Segment", command=save_segment_label).pack(side=tk.LEFT, padx=5)
+tk.Button(controls, text="Next Log", command=next_log).pack(side=tk.LEFT, padx=5)
 tk.Button(controls, text="Quit", command=quit_program).pack(side=tk.LEFT, padx=5)
 
 # ---------------- START ----------------
-random_segment()
+next_segment(session.first_segment)
 update_frames()
 root.mainloop()
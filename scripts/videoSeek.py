@@ -0,0 +1,159 @@
+#frame-accurate seeking for the labelers via a cached per-video keyframe index
+
+import json
+import os
+import re
+import shutil
+import subprocess
+from bisect import bisect_right
+
+import cv2
+
+
+def index_path(video_path):
+    """Keyframe index cache stored next to the video."""
+    return video_path + ".keyframes.json"
+
+
+def _probe_ffprobe(ffprobe, video_path):
+    """Packet pts and keyframe flags from ffprobe (reads packets only, no decoding)."""
+    out = subprocess.run(
+        [ffprobe, "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts,flags", "-of", "csv=p=0", video_path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    packets = []
+    for line in out.splitlines():
+        pts, _, flags = line.partition(",")
+        if pts and pts != "N/A":
+            packets.append((int(pts), "K" in flags))
+    return packets
+
+
+def _probe_ffmpeg(ffmpeg, video_path):
+    """Frame pts and keyframe flags from ffmpeg's showinfo filter (decodes the video once)."""
+    err = subprocess.run(
+        [ffmpeg, "-hide_banner", "-nostats", "-i", video_path, "-map", "0:v:0",
+         "-vf", "showinfo", "-f", "null", "-"],
+        check=True, capture_output=True, text=True,
+    ).stderr
+    return [(int(m.group(1)), m.group(2) == "1")
+            for m in re.finditer(r"pts:\s*(-?\d+).*?iskey:(\d)", err)]
+
+
+def find_probe_tool():
+    """Return ('ffprobe'|'ffmpeg', executable) or None if neither is available."""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe:
+        return "ffprobe", ffprobe
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        try:
+            import imageio_ffmpeg
+            ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+        except (ImportError, RuntimeError):
+            return None
+    return "ffmpeg", ffmpeg
+
+
+def build_keyframe_index(video_path):
+    """Return (frame_count, sorted keyframe display indices) for a video, or None if it can't be probed."""
+    tool = find_probe_tool()
+    if tool is None:
+        return None
+    kind, exe = tool
+    try:
+        packets = _probe_ffprobe(exe, video_path) if kind == "ffprobe" else _probe_ffmpeg(exe, video_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Could not index keyframes of {video_path}: {e}")
+        return None
+    # Packets come in decode order; a frame's display index is its rank by pts
+    order = sorted(range(len(packets)), key=lambda i: packets[i][0])
+    keyframes = [rank for rank, i in enumerate(order) if packets[i][1]]
+    return len(packets), keyframes
+
+
+def load_keyframe_index(video_path):
+    """Keyframe index from the cache file next to the video, rebuilding it if stale.
+
+    Returns (frame_count, keyframes) or None when no probe tool is available.
+    """
+    stat = os.stat(video_path)
+    cache = index_path(video_path)
+    try:
+        with open(cache, "r") as f:
+            data = json.load(f)
+        if data["size"] == stat.st_size and data["mtime_ns"] == stat.st_mtime_ns:
+            return data["frame_count"], data["keyframes"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    built = build_keyframe_index(video_path)
+    if built is None:
+        return None
+    frame_count, keyframes = built
+    try:
+        with open(cache + ".tmp", "w") as f:
+            json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                       "frame_count": frame_count, "keyframes": keyframes}, f)
+        os.replace(cache + ".tmp", cache)
+    except OSError as e:
+        print(f"Could not write keyframe index {cache}: {e}")
+    return frame_count, keyframes
+
+
+class SeekableCapture:
+    """cv2.VideoCapture that returns exactly the requested frame index.
+
+    Random access seeks to the nearest keyframe at or before the target (a
+    position every decoder lands on exactly) and decodes forward; reads that
+    are ahead of the current position within the same GOP just decode
+    forward without seeking. Without a keyframe index (no ffprobe/ffmpeg) it
+    falls back to CAP_PROP_POS_FRAMES seeks.
+    """
+
+    def __init__(self, video_path):
+        self.path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video: {video_path}")
+        index = load_keyframe_index(video_path)
+        if index is None:
+            print(f"No keyframe index for {video_path}; seeking may be inaccurate")
+            self.frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            self.keyframes = None
+        else:
+            self.frame_count, self.keyframes = index
+        self._next = 0  # index of the frame the next cap.read() returns
+
+    def keyframe_at_or_before(self, index):
+        pos = bisect_right(self.keyframes, index)
+        return self.keyframes[pos - 1] if pos else 0
+
+    def read_at(self, index):
+        """Decoded BGR frame at `index`, or None past the end of the video."""
+        if index < 0 or index >= self.frame_count:
+            return None
+        if index != self._next:
+            if self.keyframes is None:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                self._next = index
+            else:
+                keyframe = self.keyframe_at_or_before(index)
+                if not (keyframe <= self._next < index):
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+                    self._next = keyframe
+                while self._next < index:
+                    if not self.cap.grab():
+                        self._next = -1
+                        return None
+                    self._next += 1
+        ret, frame = self.cap.read()
+        if not ret:
+            self._next = -1  # position unknown, force a seek next time
+            return None
+        self._next = index + 1
+        return frame
+
+    def release(self):
+        self.cap.release()
@@ -0,0 +1,42 @@
+#camera order and on-screen tile sizes shared by the labelers
+
+CAMERA_IDS = ["L0", "L1", "L2", "F0", "B0", "R0", "R1", "R2"]
+
+
+def tile_size(cam):
+    """(width, height) a camera is displayed at: F0 large, the rest small."""
+    return (640, 360) if cam == "F0" else (320, 180)
+
+
+TILE_SIZES = {cam: tile_size(cam) for cam in CAMERA_IDS}
+
+
+# Composited single-video layout, matching the labeler grid: L cameras stacked on
+# the left, F0 over B0 in the middle, R cameras stacked on the right
+MOSAIC_STREAM = "mosaic"
+MOSAIC_SIZE = (1280, 540)
+MOSAIC_LAYOUT = {
+    "L0": (0, 0), "L1": (0, 180), "L2": (0, 360),
+    "F0": (320, 0), "B0": (480, 360),
+    "R0": (960, 0), "R1": (960, 180), "R2": (960, 360),
+}
+
+
+PROXY_SUFFIX = "_proxy"
+
+# Memory-mapped tile archive (see frameArchive), an exact-frame alternative to the videos
+ARCHIVE_STREAM = "archive"
+
+
+def proxy_stream(cam):
+    """Stream name of a camera's low-resolution proxy video, e.g. F0_proxy."""
+    return f"{cam}{PROXY_SUFFIX}"
+
+
+def video_filename(base_name, stream):
+    """File name of a log's camera, proxy or mosaic video, or of its frame archive."""
+    if stream == MOSAIC_STREAM:
+        return f"{base_name}_mosaic.mp4"
+    if stream == ARCHIVE_STREAM:
+        return f"{base_name}_archive.bin"
+    return f"{base_name}{stream}.mp4"